@@ -1,19 +1,19 @@
-import os
-from langchain_core.prompts import PromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
-from dotenv import load_dotenv
-
-load_dotenv()
+from agents.llm import llm_registry
 
 class AnimatorAgent:
     def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", google_api_key=os.getenv("GEMINI_API_KEY"))
         self.system_prompt = """You are the Animator Agent. Your specific role is to write code that generates educational animations.
 When a user asks for an animation or video of a concept (strictly bounded to DSA, OOPS, CN, DBMS, Physics, Mathematics, Chemistry), your job is to write a well-structured Python Manim script that visualizes this concept.
 You MUST return ONLY the Python code for the complete, runnable Manim scene. Do not include extra pleasantries.
 Only return python code blocks."""
 
+    @property
+    def llm(self):
+        return llm_registry.get("gemini-2.5-flash", 0.7)
+
     def get_prompt(self):
+        from langchain_core.prompts import PromptTemplate  # only needed here; slow to import
+
         return PromptTemplate.from_template(self.system_prompt + "\n\nUser: {human_input}\nAnimator:")
 
     def generate_response(self, user_input: str) -> str:
@@ -1,9 +1,5 @@
-import os
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import SystemMessage, HumanMessage
-from dotenv import load_dotenv
-
-load_dotenv()
+from agents.llm import llm_registry
+from agents.prompts import AgentPrompt
 
 
 def _get_last_human_text(state) -> str:
@@ -18,77 +14,88 @@ def _get_last_human_text(state) -> str:
     return ""
 
 
+# Coaching style by frustration severity: >= 0.80, >= 0.55, >= 0.30, below
+COACHING_MODES = (
+    "CRISIS MODE: The student is extremely frustrated and on the verge of giving up. "
+    "Your ONLY job right now is to make them feel heard and supported. "
+    "DO NOT mention any academic content. DO NOT ask them to try again. "
+    "Simply validate their feelings deeply, normalize the struggle profoundly, "
+    "and remind them that frustration means they're pushing their limits — that's growth. "
+    "Be genuinely human, warm, and empathetic. Use personal, encouraging language.",
+    "HIGH FRUSTRATION: The student is visibly struggling. Lead with strong empathy. "
+    "Validate first, then gently offer 1-2 study strategies (like the Pomodoro technique, "
+    "taking a break, or trying a different approach). Only briefly mention academic content at the end.",
+    "MODERATE CHALLENGE: The student is finding things hard but not overwhelmed. "
+    "Acknowledge their effort, provide motivation, and suggest a concrete study tip. "
+    "Help them reframe the difficulty as a normal part of learning.",
+    "MAINTENANCE MODE: The student is doing okay but could use encouragement. "
+    "Celebrate their progress, highlight what they've learned, and give them energy "
+    "to keep going. Be enthusiastic and positive.",
+)
+
+
+def _coaching_mode(frustration: float) -> int:
+    if frustration >= 0.80:
+        return 0
+    if frustration >= 0.55:
+        return 1
+    if frustration >= 0.30:
+        return 2
+    return 3
+
+
+def _coach_prefix(mode: int) -> str:
+    return (
+        f"You are the Coach Agent — an empathetic mentor, growth mindset advocate, and learning psychologist.\n\n"
+        f"COACHING MODE: {COACHING_MODES[mode]}\n\n"
+        f"COACHING TOOLKIT (use as appropriate):\n"
+        f"• Validate feelings explicitly ('It's completely normal to feel...')\n"
+        f"• Growth mindset reframes ('Every mistake is data, not failure')\n"
+        f"• Study techniques: Pomodoro, spaced repetition, rubber duck debugging, active recall\n"
+        f"• Progress celebration: highlight what they HAVE mastered\n"
+        f"• Motivational stories or analogies from famous scientists/engineers who struggled\n\n"
+        f"FORMAT: Use warm, conversational language. 3-4 short paragraphs max. "
+        f"End with a specific, actionable next step (not academic content — something they can do RIGHT NOW "
+        f"to reset mentally, like 'Take a 5-minute walk' or 'Write down what you DO know').\n\n"
+    )
+
+
+COACH_CONTEXT = (
+    "STUDENT DATA:\n"
+    "• Current Topic: {topic}\n"
+    "• Sentiment: {sentiment} | Frustration: {frustration:.0%}\n"
+    "• Global Mastery Progress: {mastery:.1%}\n"
+    "• Recent Attempts: {attempts_summary}\n\n"
+    "SCOPE: Keep coaching relevant to learning {topic}."
+)
+
+COACH_PROMPTS = tuple(AgentPrompt("coach", _coach_prefix(mode), COACH_CONTEXT) for mode in range(len(COACHING_MODES)))
+
+
 class CoachAgent:
-    def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            google_api_key=os.getenv("GEMINI_API_KEY"),
-            temperature=0.8,  # more creative/warm for coaching
-        )
+    @property
+    def llm(self):
+        return llm_registry.get("gemini-2.5-flash", 0.8)  # more creative/warm for coaching
 
     def generate_response(self, state: dict) -> str:
-        human_input = _get_last_human_text(state)
-        frustration = state.get("frustration_level", 0.0)
-        sentiment = state.get("sentiment", "neutral")
-        mastery = state.get("global_mastery_score", 0.0)
-        topic = state.get("current_topic", "your topic")
-        attempts_summary = _build_attempt_summary(state)
-
-        # Choose coaching style based on frustration severity
-        if frustration >= 0.80:
-            coaching_mode = (
-                "CRISIS MODE: The student is extremely frustrated and on the verge of giving up. "
-                "Your ONLY job right now is to make them feel heard and supported. "
-                "DO NOT mention any academic content. DO NOT ask them to try again. "
-                "Simply validate their feelings deeply, normalize the struggle profoundly, "
-                "and remind them that frustration means they're pushing their limits — that's growth. "
-                "Be genuinely human, warm, and empathetic. Use personal, encouraging language."
-            )
-        elif frustration >= 0.55:
-            coaching_mode = (
-                "HIGH FRUSTRATION: The student is visibly struggling. Lead with strong empathy. "
-                "Validate first, then gently offer 1-2 study strategies (like the Pomodoro technique, "
-                "taking a break, or trying a different approach). Only briefly mention academic content at the end."
-            )
-        elif frustration >= 0.30:
-            coaching_mode = (
-                "MODERATE CHALLENGE: The student is finding things hard but not overwhelmed. "
-                "Acknowledge their effort, provide motivation, and suggest a concrete study tip. "
-                "Help them reframe the difficulty as a normal part of learning."
-            )
-        else:
-            coaching_mode = (
-                "MAINTENANCE MODE: The student is doing okay but could use encouragement. "
-                "Celebrate their progress, highlight what they've learned, and give them energy "
-                "to keep going. Be enthusiastic and positive."
-            )
-
-        system_text = (
-            f"You are the Coach Agent — an empathetic mentor, growth mindset advocate, and learning psychologist.\n\n"
-            f"COACHING MODE: {coaching_mode}\n\n"
-            f"STUDENT DATA:\n"
-            f"• Current Topic: {topic}\n"
-            f"• Sentiment: {sentiment} | Frustration: {frustration:.0%}\n"
-            f"• Global Mastery Progress: {mastery:.1%}\n"
-            f"• Recent Attempts: {attempts_summary}\n\n"
-            f"COACHING TOOLKIT (use as appropriate):\n"
-            f"• Validate feelings explicitly ('It's completely normal to feel...')\n"
-            f"• Growth mindset reframes ('Every mistake is data, not failure')\n"
-            f"• Study techniques: Pomodoro, spaced repetition, rubber duck debugging, active recall\n"
-            f"• Progress celebration: highlight what they HAVE mastered\n"
-            f"• Motivational stories or analogies from famous scientists/engineers who struggled\n\n"
-            f"FORMAT: Use warm, conversational language. 3-4 short paragraphs max. "
-            f"End with a specific, actionable next step (not academic content — something they can do RIGHT NOW "
-            f"to reset mentally, like 'Take a 5-minute walk' or 'Write down what you DO know').\n\n"
-            f"SCOPE: Keep coaching relevant to learning {topic}."
-        )
+        response = self.llm.invoke(self._build_messages(state))
+        return response.content
 
-        response = self.llm.invoke([
-            SystemMessage(content=system_text),
-            HumanMessage(content=human_input),
-        ])
+    async def agenerate_response(self, state: dict) -> str:
+        response = await self.llm.ainvoke(self._build_messages(state))
         return response.content
 
+    def _build_messages(self, state: dict) -> list:
+        frustration = state.get("frustration_level", 0.0)
+        return COACH_PROMPTS[_coaching_mode(frustration)].messages(
+            _get_last_human_text(state),
+            topic=state.get("current_topic", "your topic"),
+            sentiment=state.get("sentiment", "neutral"),
+            frustration=frustration,
+            mastery=state.get("global_mastery_score", 0.0),
+            attempts_summary=_build_attempt_summary(state),
+        )
+
 
 def _build_attempt_summary(state: dict) -> str:
     mastery_levels = state.get("mastery_levels", {})
@@ -1,12 +1,8 @@
-import os
 import json
 import re
 from typing import Tuple, Dict, Any
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import SystemMessage, HumanMessage
-from dotenv import load_dotenv
-
-load_dotenv()
+from agents.llm import llm_registry
+from agents.prompts import AgentPrompt
 
 
 def _get_last_human_text(state) -> str:
@@ -41,55 +37,62 @@ def _extract_score(text: str) -> int:
     return 5  # neutral fallback
 
 
+EVALUATOR_PROMPT = AgentPrompt(
+    "evaluator",
+    "You are the Evaluator Agent — a precise, fair, and structured academic assessor.\n\n"
+    "EVALUATION PROTOCOL:\n"
+    "1. Analyze the student's response for correctness and conceptual depth.\n"
+    "2. Compare against the Gold Standard and learning objectives.\n"
+    "3. Output a structured evaluation with this EXACT format:\n\n"
+    "   **Correctness Score: X/10**\n"
+    "   **Verdict:** [Mastered ✅ / Needs Improvement ⚠️ / Incorrect ❌]\n"
+    "   **Objectives Met:** [list them]\n"
+    "   **Key Misconceptions:** [list them, or 'None' if none]\n"
+    "   **Feedback:** [2-4 sentences of specific, constructive feedback]\n\n"
+    "CRITICAL RULES:\n"
+    "• Passing threshold: 6/10 or above\n"
+    "• If they pass → congratulate and hint at what to learn next\n"
+    "• If they fail → give precise feedback but DO NOT teach (the Tutor handles teaching)\n"
+    "• Adjust grading standards to the student's mastery level\n"
+    "• SCOPE: Evaluate ONLY DSA, OOP, Networks, DBMS, Physics, Math, Chemistry\n\n",
+    "EVALUATION CONTEXT:\n"
+    "• Current Topic: {topic}\n"
+    "• Student's Global Mastery: {mastery_score:.1%}\n"
+    "• Learning Objectives to Check: {objectives}\n"
+    "• Gold Standard Reference: {gold_standard}",
+)
+
+
 class EvaluatorAgent:
-    def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            google_api_key=os.getenv("GEMINI_API_KEY"),
-            temperature=0.3,  # lower temp for consistent grading
-        )
+    @property
+    def llm(self):
+        return llm_registry.get("gemini-2.5-flash", 0.3)  # lower temp for consistent grading
 
     def generate_response(self, state: dict) -> Tuple[str, Dict[str, Any]]:
         """
         Returns: (response_text, evaluation_result_dict)
         The dict contains: score, passed, topic, feedback_summary
         """
-        human_input = _get_last_human_text(state)
+        response = self.llm.invoke(self._build_messages(state))
+        return self._parse_response(state, response.content)
+
+    async def agenerate_response(self, state: dict) -> Tuple[str, Dict[str, Any]]:
+        response = await self.llm.ainvoke(self._build_messages(state))
+        return self._parse_response(state, response.content)
+
+    def _build_messages(self, state: dict) -> list:
         topic = state.get("current_topic", "General")
         objectives = state.get("remaining_objectives", [])
-        gold_standard = state.get("gold_standard_answer") or "No reference provided. Use your expert knowledge."
-        mastery_score = state.get("global_mastery_score", 0.0)
-
-        system_text = (
-            f"You are the Evaluator Agent — a precise, fair, and structured academic assessor.\n\n"
-            f"EVALUATION CONTEXT:\n"
-            f"• Current Topic: {topic}\n"
-            f"• Student's Global Mastery: {mastery_score:.1%}\n"
-            f"• Learning Objectives to Check: {objectives if objectives else 'General understanding of ' + topic}\n"
-            f"• Gold Standard Reference: {gold_standard}\n\n"
-            f"EVALUATION PROTOCOL:\n"
-            f"1. Analyze the student's response for correctness and conceptual depth.\n"
-            f"2. Compare against the Gold Standard and learning objectives.\n"
-            f"3. Output a structured evaluation with this EXACT format:\n\n"
-            f"   **Correctness Score: X/10**\n"
-            f"   **Verdict:** [Mastered ✅ / Needs Improvement ⚠️ / Incorrect ❌]\n"
-            f"   **Objectives Met:** [list them]\n"
-            f"   **Key Misconceptions:** [list them, or 'None' if none]\n"
-            f"   **Feedback:** [2-4 sentences of specific, constructive feedback]\n\n"
-            f"CRITICAL RULES:\n"
-            f"• Passing threshold: 6/10 or above\n"
-            f"• If they pass → congratulate and hint at what to learn next\n"
-            f"• If they fail → give precise feedback but DO NOT teach (the Tutor handles teaching)\n"
-            f"• Adjust grading standards to the student's mastery level\n"
-            f"• SCOPE: Evaluate ONLY DSA, OOP, Networks, DBMS, Physics, Math, Chemistry"
+        return EVALUATOR_PROMPT.messages(
+            _get_last_human_text(state),
+            topic=topic,
+            mastery_score=state.get("global_mastery_score", 0.0),
+            objectives=objectives if objectives else "General understanding of " + topic,
+            gold_standard=state.get("gold_standard_answer") or "No reference provided. Use your expert knowledge.",
         )
 
-        response = self.llm.invoke([
-            SystemMessage(content=system_text),
-            HumanMessage(content=human_input),
-        ])
-
-        response_text = response.content
+    def _parse_response(self, state: dict, response_text: str) -> Tuple[str, Dict[str, Any]]:
+        topic = state.get("current_topic", "General")
         score = _extract_score(response_text)
         passed = score >= 6
 
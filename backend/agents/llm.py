@@ -0,0 +1,66 @@
+"""
+Shared registry of LLM clients for all agents.
+
+Clients are built on first use and keyed by (model, temperature). Every Gemini
+client is a copy of one root client, so they all share a single google-genai
+Client and its HTTP connection pools. Importing an agent no longer constructs
+(or needs an API key for) anything.
+
+Every client is handed out behind agents.rate_limit's per-model limiter, so
+all agents share one request budget and concurrency window per model.
+
+Tests and benchmarks can inject a local fake with set_factory().
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from agents.rate_limit import RateLimitedChatModel, llm_limits
+
+
+class LLMRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: Dict[Tuple[str, float], Any] = {}
+        self._root = None
+        self._factory: Optional[Callable[[str, float], Any]] = None
+
+    def get(self, model: str, temperature: float) -> Any:
+        key = (model, temperature)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._factory(model, temperature) if self._factory else self._build(model, temperature)
+                    if llm_limits.enabled:
+                        client = RateLimitedChatModel(client, llm_limits.for_model(model))
+                    self._clients[key] = client
+        return client
+
+    def set_factory(self, factory: Optional[Callable[[str, float], Any]]):
+        """Route every get() through factory(model, temperature); None restores Gemini."""
+        with self._lock:
+            self._factory = factory
+            self._clients.clear()
+
+    def _build(self, model: str, temperature: float):
+        # Caller holds self._lock
+        if self._root is None:
+            from langchain_google_genai import ChatGoogleGenerativeAI
+
+            load_dotenv()
+            self._root = ChatGoogleGenerativeAI(
+                model=model,
+                google_api_key=os.getenv("GEMINI_API_KEY"),
+                temperature=temperature,
+            )
+            return self._root
+        # Shallow copy: same underlying genai Client → shared transport and pools
+        return self._root.model_copy(update={"model": model, "temperature": temperature, "profile": None})
+
+
+llm_registry = LLMRegistry()
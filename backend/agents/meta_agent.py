@@ -2,7 +2,8 @@
 Meta-Agent: The master orchestrator that coordinates all other agents.
 
 Responsibilities:
-1. Analyzes every student message with an LLM → returns structured JSON
+1. Analyzes every student message — locally when the intent classifier is
+   confident, otherwise with an LLM → returns structured JSON
 2. Updates state: sentiment, frustration_level, engagement_score, current_topic, next_agent
 3. The LangGraph router reads state["next_agent"] set by this agent
 4. Suppresses Socratic mode if frustration is high (Conflict Resolution)
@@ -11,12 +12,12 @@ Responsibilities:
 import os
 import json
 import re
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import SystemMessage, HumanMessage
-from dotenv import load_dotenv
+from agents.llm import llm_registry
+from agents.prompts import AgentPrompt
+from metrics import ROUTING_DECISIONS, ROUTING_JSON_FALLBACKS
+from cache import TTLCache
 from ml.sentiment import analyze_sentiment, update_frustration_with_decay
-
-load_dotenv()
+from ml.intent import classify_intent, normalize_text
 
 
 META_SYSTEM_PROMPT = """You are the Master Orchestrator of a multi-agent educational AI system.
@@ -49,9 +50,11 @@ TOPIC DETECTION: Detect if the message is about DSA, OOP, CN, DBMS, Physics, Mat
 If the topic is outside these, set detected_topic to "out_of_scope".
 """
 
+META_PROMPT = AgentPrompt("meta_agent", META_SYSTEM_PROMPT)
 
-def _extract_json(text: str) -> dict:
-    """Robustly extract JSON from LLM response that might have extra text."""
+
+def _try_parse_json(text: str):
+    """Parse a JSON object from an LLM response that might have extra text; None if impossible."""
     # Try direct parse
     try:
         return json.loads(text)
@@ -65,6 +68,14 @@ def _extract_json(text: str) -> dict:
             return json.loads(match.group())
         except json.JSONDecodeError:
             pass
+    return None
+
+
+def _extract_json(text: str) -> dict:
+    """Robustly extract JSON from LLM response that might have extra text."""
+    parsed = _try_parse_json(text)
+    if parsed is not None:
+        return parsed
 
     # Fallback defaults
     return {
@@ -77,19 +88,134 @@ def _extract_json(text: str) -> dict:
     }
 
 
+# Fields of the LLM decision that depend only on the message, topic and mastery
+# band — safe to reuse across students. Frustration blending stays per-session.
+CACHEABLE_ROUTING_FIELDS = (
+    "intent", "detected_topic", "frustration_signal", "next_agent", "reasoning", "suggested_objective",
+)
+
+
+def _route_cache_key(last_text: str, state: dict) -> tuple:
+    mastery_bucket = int(float(state.get("global_mastery_score", 0.0) or 0.0) * 10)  # 10% bands
+    return (normalize_text(last_text), state.get("current_topic"), mastery_bucket)
+
+
+def _ml_only_analysis(ml_frustration: float) -> dict:
+    return {
+        "intent": "learn",
+        "detected_topic": None,
+        "frustration_signal": ml_frustration,
+        "next_agent": "coach" if ml_frustration > 0.6 else "tutor",
+        "reasoning": "LLM fallback — using sentiment only",
+        "suggested_objective": None,
+    }
+
+
+# AgentState.priority_level per routed agent: 1 (critical) … 5 (standard).
+# The specialist's LLM calls are scheduled at this priority (agents/rate_limit.py).
+AGENT_PRIORITY = {"coach": 1, "evaluator": 3, "planner": 4, "tutor": 5}
+
+
 class MetaAgent:
     def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",   # fast, cheap model for routing
-            google_api_key=os.getenv("GEMINI_API_KEY"),
-            temperature=0.1,            # low temp for consistent JSON
+        # Turns whose local classifier confidence clears this skip the LLM (>1 disables)
+        self.local_route_threshold = float(os.getenv("META_LOCAL_ROUTE_THRESHOLD", "0.8"))
+        self.route_counts = {"local": 0, "cached": 0, "llm": 0, "fallback": 0}
+        self.route_cache = TTLCache(
+            max_entries=int(os.getenv("ROUTE_CACHE_MAX_ENTRIES", "4096")),
+            ttl_seconds=float(os.getenv("ROUTE_CACHE_TTL_SECONDS", "3600")),
         )
 
+    @property
+    def llm(self):
+        # fast, cheap model for routing; low temp for consistent JSON
+        return llm_registry.get("gemini-2.0-flash", 0.1)
+
+    def _count_route(self, source: str):
+        self.route_counts[source] += 1
+        ROUTING_DECISIONS.labels(source).inc()
+
+    def routing_stats(self) -> dict:
+        total = sum(self.route_counts.values())
+        return {
+            **self.route_counts,
+            "local_share": round(self.route_counts["local"] / total, 4) if total else 0.0,
+            "route_cache": self.route_cache.stats(),
+        }
+
+    def routes_without_llm(self, state: dict) -> bool:
+        """True if this turn will be routed locally or from the routing cache."""
+        last_text, ml_signal = self._prepare(state)
+        if classify_intent(last_text, ml_signal, state.get("current_topic"))["confidence"] >= self.local_route_threshold:
+            return True
+        return self.route_cache.peek(_route_cache_key(last_text, state)) is not None
+
+    def _route_without_llm(self, state: dict, last_text: str, ml_signal):
+        """
+        Returns (analysis, cache_key). analysis is the local classifier's decision
+        if it is confident enough, else a memoized LLM decision, else None.
+        """
+        decision = classify_intent(last_text, ml_signal, state.get("current_topic"))
+        if decision.pop("confidence") >= self.local_route_threshold:
+            self._count_route("local")
+            return decision, None
+
+        cache_key = _route_cache_key(last_text, state)
+        cached = self.route_cache.get(cache_key)
+        if cached is not None:
+            self._count_route("cached")
+            return dict(cached), cache_key
+        return None, cache_key
+
+    def _accept_llm_response(self, content: str, cache_key: tuple) -> dict:
+        analysis = _try_parse_json(content)
+        if analysis is None:
+            self._count_route("fallback")
+            ROUTING_JSON_FALLBACKS.inc()
+            return _extract_json(content)
+        self._count_route("llm")
+        self.route_cache.put(cache_key, {k: analysis.get(k) for k in CACHEABLE_ROUTING_FIELDS})
+        return analysis
+
     def analyze(self, state: dict) -> dict:
         """
         Runs on every student message.
         Returns a state-update dict with routing decision and updated ML fields.
         """
+        last_text, ml_signal = self._prepare(state)
+
+        # --- Local fast path / memoized decision: no LLM round trip ---
+        analysis, cache_key = self._route_without_llm(state, last_text, ml_signal)
+
+        # --- LLM-based Intent & Route Classification ---
+        if analysis is None:
+            try:
+                llm_response = self.llm.invoke(self._build_messages(state, last_text))
+                analysis = self._accept_llm_response(llm_response.content, cache_key)
+            except Exception as e:
+                print(f"[MetaAgent] LLM error: {e}, using ML-only fallback")
+                analysis = _ml_only_analysis(ml_signal[0])
+                self._count_route("fallback")
+
+        return self._finalize(state, analysis, ml_signal)
+
+    async def aanalyze(self, state: dict) -> dict:
+        """Async variant of analyze() — the routing call uses ainvoke."""
+        last_text, ml_signal = self._prepare(state)
+        analysis, cache_key = self._route_without_llm(state, last_text, ml_signal)
+
+        if analysis is None:
+            try:
+                llm_response = await self.llm.ainvoke(self._build_messages(state, last_text))
+                analysis = self._accept_llm_response(llm_response.content, cache_key)
+            except Exception as e:
+                print(f"[MetaAgent] LLM error: {e}, using ML-only fallback")
+                analysis = _ml_only_analysis(ml_signal[0])
+                self._count_route("fallback")
+
+        return self._finalize(state, analysis, ml_signal)
+
+    def _prepare(self, state: dict):
         # --- Get last human message ---
         messages = state.get("messages", [])
         last_text = ""
@@ -102,27 +228,14 @@ class MetaAgent:
                 break
 
         # --- ML Sentiment Analysis (fast, no LLM call) ---
-        ml_frustration, ml_sentiment, ml_engagement = analyze_sentiment(last_text)
+        return last_text, analyze_sentiment(last_text)
 
-        # --- LLM-based Intent & Route Classification ---
+    def _build_messages(self, state: dict, last_text: str) -> list:
         conversation_summary = f"Student message: {last_text}\nCurrent topic: {state.get('current_topic', 'Unknown')}\nGlobal mastery: {state.get('global_mastery_score', 0.0):.1%}"
+        return META_PROMPT.messages(conversation_summary)
 
-        try:
-            llm_response = self.llm.invoke([
-                SystemMessage(content=META_SYSTEM_PROMPT),
-                HumanMessage(content=conversation_summary),
-            ])
-            analysis = _extract_json(llm_response.content)
-        except Exception as e:
-            print(f"[MetaAgent] LLM error: {e}, using ML-only fallback")
-            analysis = {
-                "intent": "learn",
-                "detected_topic": None,
-                "frustration_signal": ml_frustration,
-                "next_agent": "coach" if ml_frustration > 0.6 else "tutor",
-                "reasoning": "LLM fallback — using sentiment only",
-                "suggested_objective": None,
-            }
+    def _finalize(self, state: dict, analysis: dict, ml_signal) -> dict:
+        ml_frustration, ml_sentiment, ml_engagement = ml_signal
 
         # --- Blend ML frustration with LLM frustration signal ---
         llm_frustration_raw = analysis.get("frustration_signal", 0.0)
@@ -150,6 +263,7 @@ class MetaAgent:
             "engagement_score": ml_engagement,
             "active_intervention": final_frustration > 0.65,
             "intervention_reason": analysis.get("reasoning") if final_frustration > 0.65 else None,
+            "priority_level": AGENT_PRIORITY.get(next_agent, 5),
         }
 
         # Update topic if detected
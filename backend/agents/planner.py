@@ -1,12 +1,8 @@
-import os
 import json
 import re
 from typing import Tuple, List, Dict, Any
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import SystemMessage, HumanMessage
-from dotenv import load_dotenv
-
-load_dotenv()
+from agents.llm import llm_registry
+from agents.prompts import AgentPrompt
 
 
 def _get_last_human_text(state) -> str:
@@ -20,24 +16,51 @@ def _get_last_human_text(state) -> str:
     return ""
 
 
+PLANNER_PROMPT = AgentPrompt(
+    "planner",
+    "You are the Planner Agent — a master curriculum architect and learning strategist.\n\n"
+    "YOUR RESPONSIBILITIES:\n"
+    "1. If the student states a goal → create a structured learning roadmap\n"
+    "2. If a topic is mastered → recommend the next logical topic\n"
+    "3. Break goals into 3-5 clear, actionable milestones\n"
+    "4. Always include:\n"
+    "   - **Recommended Path** (ordered list of topics)\n"
+    "   - **Current Priority** (what to focus on RIGHT NOW)\n"
+    "   - **Next Steps** (specific actions for today)\n"
+    "   - **Estimated Timeline** (realistic time estimates)\n\n"
+    "AFTER YOUR RESPONSE, add a JSON block (do NOT render as markdown) with this EXACT format:\n"
+    "OBJECTIVES_JSON: {\"objectives\": [\"objective1\", \"objective2\", \"objective3\"]}\n\n"
+    "SCOPE: DSA, OOP, Computer Networks, DBMS, Physics, Mathematics, Chemistry ONLY.\n"
+    "Use markdown formatting. Be encouraging, concrete, and strategic.\n\n",
+    "STUDENT PROFILE:\n"
+    "• Current Topic Focus: {topic}\n"
+    "• Global Mastery: {global_mastery:.1%}\n"
+    "• Mastery Breakdown:\n{mastery_text}\n"
+    "• Current Syllabus: {syllabus}\n"
+    "• Remaining Objectives: {remaining}",
+)
+
+
 class PlannerAgent:
-    def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            google_api_key=os.getenv("GEMINI_API_KEY"),
-            temperature=0.5,
-        )
+    @property
+    def llm(self):
+        return llm_registry.get("gemini-2.5-flash", 0.5)
 
     def generate_response(self, state: dict) -> Tuple[str, List[str]]:
         """
         Returns: (response_text, updated_objectives_list)
         """
-        human_input = _get_last_human_text(state)
+        response = self.llm.invoke(self._build_messages(state))
+        return self._parse_response(state, response.content)
+
+    async def agenerate_response(self, state: dict) -> Tuple[str, List[str]]:
+        response = await self.llm.ainvoke(self._build_messages(state))
+        return self._parse_response(state, response.content)
+
+    def _build_messages(self, state: dict) -> list:
         syllabus = state.get("syllabus", [])
         remaining = state.get("remaining_objectives", [])
         mastery = state.get("mastery_levels", {})
-        topic = state.get("current_topic", "General")
-        global_mastery = state.get("global_mastery_score", 0.0)
 
         # Format mastery summary
         mastery_summary = []
@@ -48,35 +71,17 @@ class PlannerAgent:
                 mastery_summary.append(f"  • {t}: {score:.0%} ({status})")
         mastery_text = "\n".join(mastery_summary) if mastery_summary else "  • No topics assessed yet"
 
-        system_text = (
-            f"You are the Planner Agent — a master curriculum architect and learning strategist.\n\n"
-            f"STUDENT PROFILE:\n"
-            f"• Current Topic Focus: {topic}\n"
-            f"• Global Mastery: {global_mastery:.1%}\n"
-            f"• Mastery Breakdown:\n{mastery_text}\n"
-            f"• Current Syllabus: {syllabus if syllabus else 'Not yet defined'}\n"
-            f"• Remaining Objectives: {remaining if remaining else 'Not yet defined'}\n\n"
-            f"YOUR RESPONSIBILITIES:\n"
-            f"1. If the student states a goal → create a structured learning roadmap\n"
-            f"2. If a topic is mastered → recommend the next logical topic\n"
-            f"3. Break goals into 3-5 clear, actionable milestones\n"
-            f"4. Always include:\n"
-            f"   - **Recommended Path** (ordered list of topics)\n"
-            f"   - **Current Priority** (what to focus on RIGHT NOW)\n"
-            f"   - **Next Steps** (specific actions for today)\n"
-            f"   - **Estimated Timeline** (realistic time estimates)\n\n"
-            f"AFTER YOUR RESPONSE, add a JSON block (do NOT render as markdown) with this EXACT format:\n"
-            f"OBJECTIVES_JSON: {{\"objectives\": [\"objective1\", \"objective2\", \"objective3\"]}}\n\n"
-            f"SCOPE: DSA, OOP, Computer Networks, DBMS, Physics, Mathematics, Chemistry ONLY.\n"
-            f"Use markdown formatting. Be encouraging, concrete, and strategic."
+        return PLANNER_PROMPT.messages(
+            _get_last_human_text(state),
+            topic=state.get("current_topic", "General"),
+            global_mastery=state.get("global_mastery_score", 0.0),
+            mastery_text=mastery_text,
+            syllabus=syllabus if syllabus else "Not yet defined",
+            remaining=remaining if remaining else "Not yet defined",
         )
 
-        response = self.llm.invoke([
-            SystemMessage(content=system_text),
-            HumanMessage(content=human_input),
-        ])
-
-        response_text = response.content
+    def _parse_response(self, state: dict, response_text: str) -> Tuple[str, List[str]]:
+        remaining = state.get("remaining_objectives", [])
 
         # Extract updated objectives from JSON block
         new_objectives = remaining[:]  # default: keep existing
@@ -0,0 +1,97 @@
+"""
+Prompt assembly for the agents.
+
+Each agent's system prompt is split into a static prefix — role, protocol,
+formatting and scope rules, identical across students — and a short dynamic
+suffix with the student-context slots. Prefixes are built once at import
+(one per variant, e.g. the Tutor's depth × Socratic-mode combinations) and
+suffix templates are parsed once, so a turn only formats a handful of
+values. Keeping the static text first also gives the provider a stable
+prompt prefix to cache.
+
+Every rendered prompt is recorded in prompt_stats (characters and estimated
+tokens per agent), exported on /stats and as copilot_prompt_* on /metrics.
+"""
+
+import string
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.messages import SystemMessage, HumanMessage
+
+from metrics import PROMPT_CHARS, PROMPT_STATIC_CHARS, PROMPT_TOKENS
+
+
+def estimate_tokens(text: str) -> int:
+    """~4 characters per token — close enough for accounting, no tokenizer needed."""
+    return (len(text) + 3) // 4
+
+
+class AgentPrompt:
+    def __init__(self, agent: str, prefix: str, suffix: str = ""):
+        self.agent = agent
+        self.prefix = prefix
+        # (literal, slot, format_spec) pieces, parsed once
+        self._parts: List[Tuple[str, Optional[str], str]] = []
+        for literal, slot, spec, conversion in string.Formatter().parse(suffix):
+            if conversion:
+                raise ValueError(f"{agent} prompt: conversions are not supported ({slot}!{conversion})")
+            self._parts.append((literal, slot, spec or ""))
+        self.slots = tuple(slot for _, slot, _ in self._parts if slot)
+
+    def render(self, **values: Any) -> str:
+        out = [self.prefix]
+        for literal, slot, spec in self._parts:
+            out.append(literal)
+            if slot:
+                out.append(format(values[slot], spec))
+        return "".join(out)
+
+    def messages(self, human_text: str, **values: Any) -> list:
+        """[SystemMessage, HumanMessage] for one LLM call, recorded in prompt_stats."""
+        system_text = self.render(**values)
+        prompt_stats.record(self.agent, system_text, human_text, len(self.prefix))
+        return [SystemMessage(content=system_text), HumanMessage(content=human_text)]
+
+
+class PromptStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._agents: Dict[str, Dict[str, int]] = {}
+
+    def record(self, agent: str, system_text: str, human_text: str, prefix_chars: int):
+        chars = len(system_text) + len(human_text)
+        tokens = estimate_tokens(system_text) + estimate_tokens(human_text)
+        with self._lock:
+            s = self._agents.setdefault(agent, {
+                "prompts": 0, "chars": 0, "tokens": 0, "static_chars": 0, "max_tokens": 0,
+            })
+            s["prompts"] += 1
+            s["chars"] += chars
+            s["tokens"] += tokens
+            s["static_chars"] += prefix_chars
+            s["max_tokens"] = max(s["max_tokens"], tokens)
+        PROMPT_TOKENS.labels(agent).observe(tokens)
+        PROMPT_CHARS.labels(agent).inc(chars)
+        PROMPT_STATIC_CHARS.labels(agent).inc(prefix_chars)
+
+    def average_chars(self, agent: str) -> int:
+        s = self._agents.get(agent)
+        return s["chars"] // s["prompts"] if s else 0
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                agent: {
+                    "prompts": s["prompts"],
+                    "total_chars": s["chars"],
+                    "total_tokens": s["tokens"],
+                    "avg_tokens": round(s["tokens"] / s["prompts"], 1),
+                    "max_tokens": s["max_tokens"],
+                    "static_share": round(s["static_chars"] / s["chars"], 4) if s["chars"] else 0.0,
+                }
+                for agent, s in self._agents.items()
+            }
+
+
+prompt_stats = PromptStats()
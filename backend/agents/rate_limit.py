@@ -0,0 +1,443 @@
+"""
+Process-wide limits on outbound LLM calls.
+
+llm_registry wraps every client in a RateLimitedChatModel, which takes a slot
+from its model's ModelLimiter around each invoke/ainvoke:
+
+  * an AIMD concurrency window caps calls in flight. It grows by about one
+    slot per window of successful calls, halves on a quota error (429 /
+    RESOURCE_EXHAUSTED) and shrinks by 10% when call latency climbs past
+    LLM_LATENCY_TOLERANCE × its baseline — the sign of server-side queueing
+    or of the client retrying quota errors on its own. Latency is tracked per
+    call class (the caller's priority level, i.e. which agent is calling): a
+    coach reply and a long tutor explanation differ in size, not congestion;
+  * a token bucket then holds each call to the model's request budget
+    (LLM_RPM_LIMITS, requests per minute), so a burst is spread out instead
+    of tripping the quota.
+
+Waiting calls are admitted in priority order (AgentState.priority_level,
+1 = critical/coach … 5 = standard/tutor), carried to the call by the
+llm_priority context variable that with_llm_priority sets around a graph
+node. A waiting call gains one level per LLM_PRIORITY_AGING_SECONDS, so a
+deep backlog of low-priority calls is never starved. LLM_RESERVED_SLOTS of
+the window are kept for critical calls (priority <= LLM_CRITICAL_PRIORITY):
+a coach intervention waits at most for the next release, however many tutor
+calls are queued, and critical waits over LLM_CRITICAL_SLO_MS are counted.
+
+Time a call spends waiting for both is exported as
+copilot_llm_queue_wait_seconds{model,priority}; the current window as
+copilot_llm_concurrency_limit{model}. Set LLM_RATE_LIMIT=0 to disable.
+"""
+
+import asyncio
+import functools
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from metrics import LLM_CONCURRENCY_LIMIT, LLM_CRITICAL_SLO_MISSES, LLM_QUEUE_WAIT, LLM_THROTTLED
+
+DEFAULT_RPM_LIMITS = "gemini-2.0-flash=2000,gemini-2.5-flash=1000"
+DEFAULT_PRIORITY = 5  # standard (tutor); also routing, summaries and speculative calls
+
+# Priority of the LLM calls made from the current graph node
+llm_priority: ContextVar[int] = ContextVar("llm_priority", default=DEFAULT_PRIORITY)
+
+
+def with_llm_priority(fn):
+    """Wrap a sync or async graph node so its LLM calls run at state["priority_level"]."""
+    def _level(state) -> int:
+        try:
+            return int(state.get("priority_level") or DEFAULT_PRIORITY)
+        except (TypeError, ValueError):
+            return DEFAULT_PRIORITY
+
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(state, *args, **kwargs):
+            token = llm_priority.set(_level(state))
+            try:
+                return await fn(state, *args, **kwargs)
+            finally:
+                llm_priority.reset(token)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(state, *args, **kwargs):
+        token = llm_priority.set(_level(state))
+        try:
+            return fn(state, *args, **kwargs)
+        finally:
+            llm_priority.reset(token)
+    return wrapper
+
+
+def _parse_limits(spec: str) -> Dict[str, float]:
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, rpm = item.partition("=")
+        limits[model.strip()] = float(rpm)
+    return limits
+
+
+def is_quota_error(error: BaseException) -> bool:
+    """429 / RESOURCE_EXHAUSTED from the Gemini client (matched on type name and message)."""
+    text = f"{type(error).__name__} {error}"
+    return any(marker in text for marker in ("429", "RESOURCE_EXHAUSTED", "ResourceExhausted", "quota"))
+
+
+class TokenBucket:
+    """Requests-per-minute budget; holds one second's worth as burst."""
+
+    def __init__(self, rpm: float):
+        self.rate = rpm / 60.0
+        self.capacity = max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token, going into debt if none is left; returns seconds to wait before using it."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class _Waiter:
+    __slots__ = ("wake", "granted", "cancelled")
+
+    def __init__(self, wake: Callable[[], Any]):
+        self.wake = wake
+        self.granted = False
+        self.cancelled = False
+
+
+def _grant(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class AIMDWindow:
+    """
+    Concurrency limit with additive increase / multiplicative decrease. Slots
+    are handed directly to the best waiter on release, from the event loop
+    (acquire) or from worker threads (acquire_sync).
+
+    Waiters sit in two heaps — critical and standard — keyed by
+    priority + enqueue_time / aging_seconds: comparing two waiters at any
+    moment by priority minus levels gained through waiting gives the same
+    order, so the keys never need updating. Standard calls may only fill the
+    window up to its last `reserved` slots.
+    """
+
+    def __init__(self, initial: float, minimum: float = 1, maximum: float = 64,
+                 latency_tolerance: float = 2.0, cooldown: float = 0.05, reserved: int = 0,
+                 critical_priority: int = 1, aging_seconds: float = 5.0):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_tolerance = latency_tolerance
+        # At most one decrease per max(cooldown, typical call latency): the 429s
+        # of calls that were in flight together are one congestion signal
+        self.cooldown = cooldown
+        self.reserved = reserved
+        self.critical_priority = critical_priority
+        self.aging_seconds = aging_seconds
+        self.in_flight = 0
+        self._critical: List[Tuple[float, int, _Waiter]] = []
+        self._standard: List[Tuple[float, int, _Waiter]] = []
+        self._order = itertools.count()  # FIFO among equal keys
+        self._queued = 0
+        self._lock = threading.Lock()
+        # Per call class: EWMA of call latency (seconds) and the uncongested
+        # baseline, which follows the EWMA down fast and up slowly
+        self._latency: Dict[Any, float] = {}
+        self._baseline: Dict[Any, float] = {}
+        self._typical = None  # EWMA over every call: paces decreases
+        self._last_decrease = 0.0
+
+    def _slots(self) -> int:
+        return max(int(self.limit), 1)
+
+    def _standard_slots(self) -> int:
+        # The reservation never takes the last slot: standard calls always make progress
+        slots = self._slots()
+        return slots - min(self.reserved, slots - 1)
+
+    def _admits(self, priority: int) -> bool:
+        slots = self._slots() if priority <= self.critical_priority else self._standard_slots()
+        return self.in_flight < slots
+
+    async def acquire(self, priority: int = DEFAULT_PRIORITY):
+        with self._lock:
+            if not self._queued and self._admits(priority):
+                self.in_flight += 1
+                return
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            waiter = _Waiter(lambda: loop.call_soon_threadsafe(_grant, future))
+            self._push(waiter, priority)
+            woken = self._hand_off()
+        for wake in woken:
+            wake()
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    waiter.cancelled = True  # dropped lazily when it reaches a heap's top
+                    self._queued -= 1
+            if granted:
+                self.release()  # the slot was handed over as we were cancelled
+            raise
+
+    def acquire_sync(self, priority: int = DEFAULT_PRIORITY):
+        with self._lock:
+            if not self._queued and self._admits(priority):
+                self.in_flight += 1
+                return
+            event = threading.Event()
+            self._push(_Waiter(event.set), priority)
+            woken = self._hand_off()
+        for wake in woken:
+            wake()
+        event.wait()
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+            woken = self._hand_off()
+        for wake in woken:
+            wake()
+
+    def _push(self, waiter: _Waiter, priority: int):
+        # Caller holds self._lock
+        heap = self._critical if priority <= self.critical_priority else self._standard
+        key = priority + time.monotonic() / self.aging_seconds
+        heapq.heappush(heap, (key, next(self._order), waiter))
+        self._queued += 1
+
+    @staticmethod
+    def _top(heap: list) -> Optional[Tuple[float, int, _Waiter]]:
+        while heap and heap[0][2].cancelled:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def _hand_off(self) -> List[Callable[[], Any]]:
+        # Caller holds self._lock
+        woken = []
+        while True:
+            critical, standard = self._top(self._critical), self._top(self._standard)
+            if (standard is not None and self.in_flight < self._standard_slots()
+                    and (critical is None or standard[:2] < critical[:2])):
+                heap = self._standard  # an aged standard call can go before a fresh critical one
+            elif critical is not None and self.in_flight < self._slots():
+                heap = self._critical
+            else:
+                break
+            waiter = heapq.heappop(heap)[2]
+            waiter.granted = True
+            self.in_flight += 1
+            self._queued -= 1
+            woken.append(waiter.wake)
+        return woken
+
+    def on_success(self, latency: float, call_class: Any = DEFAULT_PRIORITY):
+        with self._lock:
+            self._typical = latency if self._typical is None else self._typical + (latency - self._typical) * 0.1
+            ewma = self._latency.get(call_class)
+            if ewma is None:
+                ewma = baseline = latency
+            else:
+                # Only calls of one class are compared: a burst of short calls
+                # must not make the next long ones look congested
+                ewma += (latency - ewma) * 0.1
+                baseline = self._baseline[call_class]
+                baseline = ewma if ewma < baseline else baseline + (ewma - baseline) * 0.01
+            self._latency[call_class] = ewma
+            self._baseline[call_class] = baseline
+            if ewma > baseline * self.latency_tolerance:
+                self._decrease(0.9)
+            elif self._queued or self.in_flight >= self._slots():
+                # Grow only while demand fills the window: an idle window proves nothing
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+
+    def on_throttle(self):
+        with self._lock:
+            self._decrease(0.5)
+
+    def _decrease(self, factor: float):
+        # Caller holds self._lock
+        now = time.monotonic()
+        if now - self._last_decrease >= max(self.cooldown, self._typical or 0.0):
+            self._last_decrease = now
+            self.limit = max(self.minimum, self.limit * factor)
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    @property
+    def queued_critical(self) -> int:
+        return sum(1 for _, _, waiter in self._critical if not waiter.cancelled)
+
+
+class ModelLimiter:
+    """Window + bucket for one model; run()/run_sync() wrap a single LLM call."""
+
+    def __init__(self, model: str, rpm: float, window: AIMDWindow, critical_slo: float = 1.0):
+        self.model = model
+        self.bucket = TokenBucket(rpm)
+        self.window = window
+        self.rpm = rpm
+        self.critical_slo = critical_slo  # seconds a critical call may wait
+        self.calls = 0
+        self.throttled = 0
+        self.critical_calls = 0
+        self.critical_slo_misses = 0
+        self._limit_gauge = LLM_CONCURRENCY_LIMIT.labels(model)
+        self._limit_gauge.set(window.limit)
+
+    async def run(self, call: Callable[[], Any]) -> Any:
+        priority = llm_priority.get()
+        queued_at = time.perf_counter()
+        await self.window.acquire(priority)
+        try:
+            delay = self.bucket.reserve()
+            if delay:
+                await asyncio.sleep(delay)
+            started = time.perf_counter()
+            self._record_wait(priority, started - queued_at)
+            try:
+                result = await call()
+            except Exception as e:
+                self._on_error(e)
+                raise
+            self._on_success(time.perf_counter() - started, priority)
+            return result
+        finally:
+            self.window.release()
+
+    def run_sync(self, call: Callable[[], Any]) -> Any:
+        priority = llm_priority.get()
+        queued_at = time.perf_counter()
+        self.window.acquire_sync(priority)
+        try:
+            delay = self.bucket.reserve()
+            if delay:
+                time.sleep(delay)
+            started = time.perf_counter()
+            self._record_wait(priority, started - queued_at)
+            try:
+                result = call()
+            except Exception as e:
+                self._on_error(e)
+                raise
+            self._on_success(time.perf_counter() - started, priority)
+            return result
+        finally:
+            self.window.release()
+
+    def _record_wait(self, priority: int, wait: float):
+        LLM_QUEUE_WAIT.labels(self.model, str(priority)).observe(wait)
+        if priority <= self.window.critical_priority:
+            self.critical_calls += 1
+            if wait > self.critical_slo:
+                self.critical_slo_misses += 1
+                LLM_CRITICAL_SLO_MISSES.labels(self.model).inc()
+
+    def _on_success(self, latency: float, priority: int):
+        self.calls += 1
+        self.window.on_success(latency, priority)
+        self._limit_gauge.set(self.window.limit)
+
+    def _on_error(self, error: Exception):
+        self.calls += 1
+        if is_quota_error(error):
+            self.throttled += 1
+            LLM_THROTTLED.labels(self.model).inc()
+            self.window.on_throttle()
+            self._limit_gauge.set(self.window.limit)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rpm": self.rpm,
+            "concurrency_limit": round(self.window.limit, 2),
+            "in_flight": self.window.in_flight,
+            "queued": self.window.queued,
+            "queued_critical": self.window.queued_critical,
+            "calls": self.calls,
+            "throttled": self.throttled,
+            "critical_calls": self.critical_calls,
+            "critical_slo_misses": self.critical_slo_misses,
+        }
+
+
+class LLMLimits:
+    """One ModelLimiter per model name, created on first use."""
+
+    def __init__(self):
+        self.enabled = os.getenv("LLM_RATE_LIMIT", "1") != "0"
+        self.rpm_limits = _parse_limits(os.getenv("LLM_RPM_LIMITS", DEFAULT_RPM_LIMITS))
+        self.default_rpm = float(os.getenv("LLM_DEFAULT_RPM", "1000"))
+        self.initial_concurrency = float(os.getenv("LLM_CONCURRENCY_INITIAL", "16"))
+        self.max_concurrency = float(os.getenv("LLM_CONCURRENCY_MAX", "64"))
+        self.latency_tolerance = float(os.getenv("LLM_LATENCY_TOLERANCE", "2.0"))
+        self.reserved_slots = int(os.getenv("LLM_RESERVED_SLOTS", "2"))
+        self.critical_priority = int(os.getenv("LLM_CRITICAL_PRIORITY", "1"))
+        self.aging_seconds = float(os.getenv("LLM_PRIORITY_AGING_SECONDS", "5"))
+        self.critical_slo = float(os.getenv("LLM_CRITICAL_SLO_MS", "1000")) / 1000
+        self._limiters: Dict[str, ModelLimiter] = {}
+        self._lock = threading.Lock()
+
+    def for_model(self, model: str) -> ModelLimiter:
+        limiter = self._limiters.get(model)
+        if limiter is None:
+            with self._lock:
+                limiter = self._limiters.get(model)
+                if limiter is None:
+                    window = AIMDWindow(
+                        self.initial_concurrency, maximum=self.max_concurrency,
+                        latency_tolerance=self.latency_tolerance, reserved=self.reserved_slots,
+                        critical_priority=self.critical_priority, aging_seconds=self.aging_seconds,
+                    )
+                    rpm = self.rpm_limits.get(model, self.default_rpm)
+                    limiter = ModelLimiter(model, rpm, window, critical_slo=self.critical_slo)
+                    self._limiters[model] = limiter
+        return limiter
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {model: limiter.stats() for model, limiter in self._limiters.items()}
+
+
+class RateLimitedChatModel:
+    """
+    Proxy for a registry client: invoke/ainvoke go through the model's limiter,
+    everything else (attributes, other methods) reaches the client unchanged.
+    """
+
+    def __init__(self, client: Any, limiter: ModelLimiter):
+        self._client = client
+        self._limiter = limiter
+
+    def invoke(self, *args, **kwargs):
+        return self._limiter.run_sync(lambda: self._client.invoke(*args, **kwargs))
+
+    async def ainvoke(self, *args, **kwargs):
+        return await self._limiter.run(lambda: self._client.ainvoke(*args, **kwargs))
+
+    def __getattr__(self, name: str):
+        return getattr(self._client, name)
+
+
+llm_limits = LLMLimits()
@@ -0,0 +1,96 @@
+"""
+Rolling conversation summarization.
+
+Once a session's raw history passes COMPACT_MAX_MESSAGES messages or roughly
+COMPACT_MAX_TOKENS tokens, everything but the last COMPACT_KEEP_MESSAGES
+messages is folded into state["conversation_summary"] and removed from
+state["messages"]. In-memory state, the persisted session and prompts then
+stay bounded however long a session runs.
+"""
+
+import os
+from typing import List, Tuple
+
+from agents.llm import llm_registry
+from agents.prompts import AgentPrompt, estimate_tokens
+
+SUMMARY_MAX_CHARS = 1500   # hard cap on the stored summary
+FOLD_INPUT_MAX_CHARS = 12000  # most recent folded text sent to the model
+
+
+def _message_lines(messages: list) -> List[str]:
+    lines = []
+    for msg in messages:
+        role = "Student" if getattr(msg, "type", None) == "human" else "Tutor"
+        lines.append(f"{role}: {getattr(msg, 'content', msg)}")
+    return lines
+
+
+SUMMARIZER_PROMPT = AgentPrompt(
+    "summarizer",
+    "You maintain the running summary of a tutoring session for the tutor's memory.\n"
+    "Merge the earlier summary with the new transcript into ONE updated summary:\n"
+    "• Topics covered and what the student now understands\n"
+    "• Misconceptions, mistakes and open questions\n"
+    "• Anything the student said about goals, preferences or how they feel\n"
+    "Write plain prose, third person, under 150 words. Output only the summary.",
+)
+
+
+class ConversationSummarizer:
+    def __init__(self):
+        self.max_messages = int(os.getenv("COMPACT_MAX_MESSAGES", "24"))
+        self.max_tokens = int(os.getenv("COMPACT_MAX_TOKENS", "4000"))
+        # At least one full turn stays raw: the current turn's messages are never folded
+        self.keep_messages = max(2, int(os.getenv("COMPACT_KEEP_MESSAGES", "8")))
+
+    @property
+    def llm(self):
+        return llm_registry.get("gemini-2.0-flash", 0.2)
+
+    def split(self, state: dict) -> Tuple[list, list]:
+        """(messages to fold, messages to keep); nothing to fold below the thresholds."""
+        messages = state.get("messages", []) or []
+        if len(messages) <= self.keep_messages:
+            return [], messages
+        over = len(messages) > self.max_messages
+        if not over and self.max_tokens:
+            over = sum(estimate_tokens(str(getattr(m, "content", m))) for m in messages) > self.max_tokens
+        if not over:
+            return [], messages
+        return messages[:-self.keep_messages], messages[-self.keep_messages:]
+
+    def summarize(self, previous_summary: str, folded: list) -> str:
+        try:
+            response = self.llm.invoke(self._build_messages(previous_summary, folded))
+            return self._clip(response.content)
+        except Exception as e:
+            print(f"[Summarizer] LLM error: {e}, using extractive fallback")
+            return self._fallback(previous_summary, folded)
+
+    async def asummarize(self, previous_summary: str, folded: list) -> str:
+        try:
+            response = await self.llm.ainvoke(self._build_messages(previous_summary, folded))
+            return self._clip(response.content)
+        except Exception as e:
+            print(f"[Summarizer] LLM error: {e}, using extractive fallback")
+            return self._fallback(previous_summary, folded)
+
+    def _build_messages(self, previous_summary: str, folded: list) -> list:
+        transcript = "\n".join(_message_lines(folded))[-FOLD_INPUT_MAX_CHARS:]
+        return SUMMARIZER_PROMPT.messages(
+            f"EARLIER SUMMARY:\n{previous_summary or '(none)'}\n\n"
+            f"NEW TRANSCRIPT:\n{transcript}"
+        )
+
+    def _clip(self, text) -> str:
+        return str(text).strip()[:SUMMARY_MAX_CHARS]
+
+    def _fallback(self, previous_summary: str, folded: list) -> str:
+        # Keep the most recent folded lines that fit, each shortened
+        lines = [line[:200] for line in _message_lines(folded)]
+        text = " ".join(filter(None, [previous_summary, *lines]))
+        return text[-SUMMARY_MAX_CHARS:]
+
+
+summarizer = ConversationSummarizer()
@@ -1,9 +1,8 @@
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import SystemMessage, HumanMessage
-from dotenv import load_dotenv
-
-load_dotenv()
+from agents.llm import llm_registry
+from agents.prompts import AgentPrompt
+from cache import TTLCache
+from ml.intent import normalize_text
 
 
 def _get_last_human_text(state) -> str:
@@ -21,6 +20,9 @@ def _get_conversation_history(state, max_turns: int = 6) -> str:
     """Build a short conversation history string for context continuity."""
     messages = state.get("messages", [])
     history_lines = []
+    summary = state.get("conversation_summary")
+    if summary:
+        history_lines.append(f"Summary of earlier turns: {summary}")
     for msg in messages[-max_turns:]:
         msg_type = getattr(msg, "type", None)
         msg_content = getattr(msg, "content", None)
@@ -35,79 +37,134 @@ def _get_conversation_history(state, max_turns: int = 6) -> str:
     return "\n".join(history_lines)
 
 
+# Explanation depth, adapted to mastery: beginner (< 30%), intermediate (< 60%), advanced
+DEPTH_INSTRUCTIONS = (
+    "The student is a BEGINNER. Use very simple language, real-world analogies, "
+    "and everyday examples. Break every concept into the smallest possible steps. "
+    "Avoid jargon unless absolutely necessary, and always define it if used.",
+    "The student has INTERMEDIATE knowledge. Use proper technical terminology "
+    "but always pair it with intuitive explanations. Connect new ideas to what they already know.",
+    "The student is ADVANCED. Use precise technical language. Introduce edge cases, "
+    "complexity analysis, and nuanced distinctions. Challenge them with follow-up thinking questions.",
+)
+
+# Socratic mode: full (frustration <= 0.4) or softened when the student is frustrated
+SOCRATIC_MODES = (
+    "Use the full Socratic method. NEVER give the direct answer. "
+    "Ask probing questions, give hints, break the problem into smaller pieces.",
+    "The student is SOMEWHAT FRUSTRATED. Tone down the Socratic questioning. "
+    "Provide a bit more direct guidance and reassurance before asking questions. "
+    "Start with a validating statement.",
+)
+
+
+def _depth_tier(mastery_score: float) -> int:
+    if mastery_score < 0.30:
+        return 0
+    if mastery_score < 0.60:
+        return 1
+    return 2
+
+
+def _socratic_mode(frustration: float) -> int:
+    return 1 if frustration > 0.4 else 0
+
+
+def _tutor_prefix(tier: int, mode: int) -> str:
+    return (
+        f"You are the Tutor Agent — a world-class educational AI with deep expertise in CS and Sciences.\n\n"
+        f"PEDAGOGICAL APPROACH:\n"
+        f"{SOCRATIC_MODES[mode]}\n\n"
+        f"EXPLANATION DEPTH:\n"
+        f"{DEPTH_INSTRUCTIONS[tier]}\n\n"
+        f"FORMATTING RULES:\n"
+        f"• Use markdown: **bold** for key terms, `code` for syntax, numbered lists for steps\n"
+        f"• Keep response focused and under 350 words unless a detailed explanation is essential\n"
+        f"• Always end with ONE follow-up question to check understanding\n\n"
+        f"STRICT SCOPE: DSA, OOP, Computer Networks, DBMS, Physics, Mathematics, Chemistry ONLY. "
+        f"Politely decline anything else.\n\n"
+    )
+
+
+TUTOR_CONTEXT = (
+    "STUDENT CONTEXT:\n"
+    "• Topic: {topic} | Module: {module}\n"
+    "• Mastery Score: {mastery_score:.1%} | Sentiment: {sentiment}\n"
+    "• Frustration Level: {frustration:.2f}/1.0\n\n"
+    "CONVERSATION HISTORY (last few turns):\n{history}"
+)
+
+# One precompiled prompt per (depth tier, Socratic mode)
+TUTOR_PROMPTS = {
+    (tier, mode): AgentPrompt("tutor", _tutor_prefix(tier, mode), TUTOR_CONTEXT)
+    for tier in range(len(DEPTH_INSTRUCTIONS))
+    for mode in range(len(SOCRATIC_MODES))
+}
+
+
 class TutorAgent:
     def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            google_api_key=os.getenv("GEMINI_API_KEY"),
-            temperature=0.7,
+        # Opt-in cache of opening explanations, shared across the cohort
+        self.cache_enabled = os.getenv("TUTOR_RESPONSE_CACHE", "0") == "1"
+        self.response_cache = TTLCache(
+            max_entries=int(os.getenv("TUTOR_CACHE_MAX_ENTRIES", "2048")),
+            ttl_seconds=float(os.getenv("TUTOR_CACHE_TTL_SECONDS", "86400")),
         )
 
-    def generate_response(self, state: dict) -> str:
-        human_input = _get_last_human_text(state)
-        history = _get_conversation_history(state, max_turns=8)
+    @property
+    def llm(self):
+        return llm_registry.get("gemini-2.5-flash", 0.7)
+
+    def generate_response(self, state: dict, use_cache: bool = True) -> str:
+        cache_key = self._cache_key(state) if use_cache else None
+        if cache_key is not None:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        response = self.llm.invoke(self._build_messages(state))
+        if cache_key is not None:
+            self.response_cache.put(cache_key, response.content)
+        return response.content
+
+    async def agenerate_response(self, state: dict, use_cache: bool = True, cache_writes: bool = True) -> str:
+        cache_key = self._cache_key(state) if use_cache else None
+        if cache_key is not None:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        response = await self.llm.ainvoke(self._build_messages(state))
+        if cache_key is not None and cache_writes:
+            self.response_cache.put(cache_key, response.content)
+        return response.content
+
+    def _cache_key(self, state: dict):
+        """
+        (topic, depth tier, Socratic mode, normalized question) for turns with no
+        conversation history — the only inputs that shape such a response.
+        None when the cache is off or earlier turns would change the answer.
+        """
+        if not self.cache_enabled or len(state.get("messages", [])) > 1 or state.get("conversation_summary"):
+            return None
+        return (
+            state.get("current_topic", "General"),
+            _depth_tier(state.get("global_mastery_score", 0.0)),
+            _socratic_mode(state.get("frustration_level", 0.0)),
+            normalize_text(_get_last_human_text(state)),
+        )
 
+    def _build_messages(self, state: dict) -> list:
         mastery_score = state.get("global_mastery_score", 0.0)
         frustration = state.get("frustration_level", 0.0)
-        topic = state.get("current_topic", "General")
-        module = state.get("current_module", "Introduction")
-        sentiment = state.get("sentiment", "neutral")
-
-        # Adapt explanation depth based on mastery
-        if mastery_score < 0.30:
-            depth_instruction = (
-                "The student is a BEGINNER. Use very simple language, real-world analogies, "
-                "and everyday examples. Break every concept into the smallest possible steps. "
-                "Avoid jargon unless absolutely necessary, and always define it if used."
-            )
-        elif mastery_score < 0.60:
-            depth_instruction = (
-                "The student has INTERMEDIATE knowledge. Use proper technical terminology "
-                "but always pair it with intuitive explanations. Connect new ideas to what they already know."
-            )
-        else:
-            depth_instruction = (
-                "The student is ADVANCED. Use precise technical language. Introduce edge cases, "
-                "complexity analysis, and nuanced distinctions. Challenge them with follow-up thinking questions."
-            )
-
-        # Soften Socratic mode if frustrated
-        if frustration > 0.4:
-            socratic_mode = (
-                "The student is SOMEWHAT FRUSTRATED. Tone down the Socratic questioning. "
-                "Provide a bit more direct guidance and reassurance before asking questions. "
-                "Start with a validating statement."
-            )
-        else:
-            socratic_mode = (
-                "Use the full Socratic method. NEVER give the direct answer. "
-                "Ask probing questions, give hints, break the problem into smaller pieces."
-            )
-
-        system_text = (
-            f"You are the Tutor Agent — a world-class educational AI with deep expertise in CS and Sciences.\n\n"
-            f"PEDAGOGICAL APPROACH:\n"
-            f"{socratic_mode}\n\n"
-            f"EXPLANATION DEPTH:\n"
-            f"{depth_instruction}\n\n"
-            f"STUDENT CONTEXT:\n"
-            f"• Topic: {topic} | Module: {module}\n"
-            f"• Mastery Score: {mastery_score:.1%} | Sentiment: {sentiment}\n"
-            f"• Frustration Level: {frustration:.2f}/1.0\n\n"
-            f"CONVERSATION HISTORY (last few turns):\n{history}\n\n"
-            f"FORMATTING RULES:\n"
-            f"• Use markdown: **bold** for key terms, `code` for syntax, numbered lists for steps\n"
-            f"• Keep response focused and under 350 words unless a detailed explanation is essential\n"
-            f"• Always end with ONE follow-up question to check understanding\n\n"
-            f"STRICT SCOPE: DSA, OOP, Computer Networks, DBMS, Physics, Mathematics, Chemistry ONLY. "
-            f"Politely decline anything else."
+        prompt = TUTOR_PROMPTS[(_depth_tier(mastery_score), _socratic_mode(frustration))]
+        return prompt.messages(
+            _get_last_human_text(state),
+            topic=state.get("current_topic", "General"),
+            module=state.get("current_module", "Introduction"),
+            mastery_score=mastery_score,
+            sentiment=state.get("sentiment", "neutral"),
+            frustration=frustration,
+            history=_get_conversation_history(state, max_turns=8),
         )
 
-        response = self.llm.invoke([
-            SystemMessage(content=system_text),
-            HumanMessage(content=human_input),
-        ])
-        return response.content
-
 
 tutor_agent = TutorAgent()
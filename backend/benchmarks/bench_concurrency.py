@@ -0,0 +1,103 @@
+"""
+Concurrency ceiling of one event loop: sync graph nodes vs native async nodes.
+
+Every turn makes two simulated LLM calls (routing + specialist). With sync
+nodes, graph.ainvoke pushes each call onto the default thread pool, so
+throughput flattens at ~pool_size / latency. Async nodes await ainvoke and
+scale with the number of in-flight turns.
+
+    python -m benchmarks.bench_concurrency --latency 0.2 --levels 8,32,128,512
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-placeholder")
+# Read when agents.rate_limit is imported: this measures the event loop, not the
+# LLM limiter (whose RPM budget and concurrency window would cap both modes)
+os.environ["LLM_RATE_LIMIT"] = "0"
+
+from langchain_core.messages import HumanMessage
+from langgraph.graph import StateGraph, END
+
+import orchestrator
+from state import AgentState
+from benchmarks.fakes import install_fake_llms
+
+
+def build_sync_graph():
+    """The pre-async graph: plain sync node functions."""
+    workflow = StateGraph(AgentState)
+    workflow.add_node("meta_agent", orchestrator.meta_agent_node)
+    for name, node in (
+        ("tutor", orchestrator.tutor_node),
+        ("planner", orchestrator.planner_node),
+        ("evaluator", orchestrator.evaluator_node),
+        ("coach", orchestrator.coach_node),
+    ):
+        workflow.add_node(name, node)
+        workflow.add_edge(name, END)
+    workflow.set_entry_point("meta_agent")
+    workflow.add_conditional_edges("meta_agent", orchestrator.router)
+    return workflow.compile()
+
+
+def make_state(i: int) -> dict:
+    return {
+        "messages": [HumanMessage(content="what is a linked list")],
+        "message_cursor": 0,
+        "student_id": f"student-{i}",
+        "session_id": f"session-{i}",
+        "current_topic": "General",
+        "current_module": "Intro",
+        "mastery_levels": {},
+        "global_mastery_score": 0.0,
+        "frustration_level": 0.0,
+        "engagement_score": 1.0,
+        "sentiment": "neutral",
+        "syllabus": [],
+        "remaining_objectives": [],
+        "next_agent": "tutor",
+        "last_agent": "system",
+        "active_intervention": False,
+        "intervention_reason": None,
+        "priority_level": 4,
+        "last_evaluation_result": None,
+        "gold_standard_answer": None,
+    }
+
+
+async def run_level(graph, concurrency: int) -> float:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # nodes log every turn
+        await asyncio.gather(*(graph.ainvoke(make_state(i)) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return concurrency / elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.2, help="simulated seconds per LLM call")
+    parser.add_argument("--levels", default="8,32,128,512", help="comma-separated in-flight turn counts")
+    args = parser.parse_args()
+
+    install_fake_llms(latency=args.latency)
+    graphs = {"sync nodes": build_sync_graph(), "async nodes": orchestrator.get_app()}
+    ideal_turn = 2 * args.latency
+
+    print(f"simulated LLM latency {args.latency * 1000:.0f} ms/call, ideal turn {ideal_turn * 1000:.0f} ms")
+    print(f"{'in-flight':>10} | {'sync turns/s':>13} | {'async turns/s':>14} | {'ideal':>8}")
+    for level in (int(x) for x in args.levels.split(",")):
+        results = {name: await run_level(graph, level) for name, graph in graphs.items()}
+        print(f"{level:>10} | {results['sync nodes']:>13.1f} | {results['async nodes']:>14.1f} | "
+              f"{level / ideal_turn:>8.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,193 @@
+"""
+End-to-end load test: concurrent students driving POST /chat through the real
+main.app (FastAPI + orchestrator graph + write-behind persistence).
+
+    python -m benchmarks.bench_load --levels 1,8,32,128 --turns 5 --latency 0.2 --rtt-ms 5
+
+Each virtual student sends --turns messages one after another; a level runs
+that many students at once. LLM calls go to benchmarks.fakes.FakeChatModel and
+Firestore to InMemoryFirestore, so no network or credentials are needed.
+Reported per level: throughput, request latency percentiles, and a per-stage
+breakdown read from the app's own Prometheus histograms (metrics.py) — the
+time a turn spends in each graph node, in LLM calls and in Firestore, and
+what is left over for HTTP, graph bookkeeping and waiting on the event loop.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-placeholder")
+os.environ.pop("FIREBASE_SERVICE_ACCOUNT_PATH", None)
+
+import httpx
+from prometheus_client import REGISTRY
+
+from benchmarks.fakes import InMemoryFirestore, install_fake_llms
+
+# One student's session; turns cycle through it (learn, practice, plan, struggle)
+SCRIPT = [
+    "what is a linked list",
+    "can you explain how insertion at the head works",
+    "quiz me on linked lists",
+    "a node stores a value and a pointer to the next node",
+    "make me a study plan for data structures",
+    "I don't get it, this is so frustrating",
+    "ok explain the difference between arrays and linked lists",
+]
+
+# (histogram, label, stage name); nodes nest LLM calls, so LLM is shown separately
+STAGES = [
+    ("copilot_firestore_latency_seconds", {"operation": "get_student_session_state"}, "load session"),
+    ("copilot_node_latency_seconds", {"node": "meta_agent"}, "node: meta_agent"),
+    ("copilot_node_latency_seconds", {"node": "tutor"}, "node: tutor"),
+    ("copilot_node_latency_seconds", {"node": "planner"}, "node: planner"),
+    ("copilot_node_latency_seconds", {"node": "evaluator"}, "node: evaluator"),
+    ("copilot_node_latency_seconds", {"node": "coach"}, "node: coach"),
+    ("copilot_node_latency_seconds", {"node": "compact"}, "node: compact"),
+    ("copilot_llm_latency_seconds", None, "  of which LLM calls"),
+    ("copilot_llm_queue_wait_seconds", None, "  of which limiter wait"),
+    ("copilot_firestore_latency_seconds", {"operation": "commit"}, "save (background)"),
+]
+# Stages that run inside the request, i.e. count towards its latency
+IN_REQUEST = {"load session", "node: meta_agent", "node: tutor", "node: planner",
+              "node: evaluator", "node: coach", "node: compact"}
+
+
+def histogram_totals() -> Dict[str, tuple]:
+    """stage name → (count, sum) summed over matching label sets."""
+    totals = defaultdict(lambda: [0.0, 0.0])
+    for metric in REGISTRY.collect():
+        for sample in metric.samples:
+            for name, labels, stage in STAGES:
+                if not sample.name.startswith(name) or (labels and any(sample.labels.get(k) != v
+                                                                       for k, v in labels.items())):
+                    continue
+                if sample.name == name + "_count":
+                    totals[stage][0] += sample.value
+                elif sample.name == name + "_sum":
+                    totals[stage][1] += sample.value
+    return {stage: tuple(v) for stage, v in totals.items()}
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def student(client: httpx.AsyncClient, level: int, i: int, turns: int,
+                  latencies: List[float], errors: List[str]):
+    session_id = None
+    for turn in range(turns):
+        body = {"message": SCRIPT[(i + turn) % len(SCRIPT)], "student_id": f"load-{level}-{i}"}
+        if session_id:
+            body["session_id"] = session_id
+        start = time.perf_counter()
+        response = await client.post("/chat", json=body)
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            errors.append(f"{response.status_code}: {response.text[:120]}")
+            continue
+        session_id = response.json()["session_id"]
+
+
+async def run_level(client: httpx.AsyncClient, level: int, turns: int) -> dict:
+    from database import async_db
+
+    latencies: List[float] = []
+    errors: List[str] = []
+    before = histogram_totals()
+    start = time.perf_counter()
+    await asyncio.gather(*(student(client, level, i, turns, latencies, errors) for i in range(level)))
+    elapsed = time.perf_counter() - start
+    await async_db.flush()  # so background saves land in this level's breakdown
+    after = histogram_totals()
+
+    requests = len(latencies)
+    stages = {}
+    for _, _, stage in STAGES:
+        count = after.get(stage, (0, 0))[0] - before.get(stage, (0, 0))[0]
+        seconds = after.get(stage, (0, 0))[1] - before.get(stage, (0, 0))[1]
+        stages[stage] = (count, seconds)
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput": requests / elapsed,
+        "mean": statistics.fmean(latencies),
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "stages": stages,
+    }
+
+
+def print_level(level: int, result: dict):
+    requests = result["requests"]
+    print(f"\n{level} concurrent students — {requests} requests, {len(result['errors'])} errors, "
+          f"{result['throughput']:.1f} req/s")
+    print(f"  latency ms: mean {result['mean'] * 1000:.1f}  p50 {result['p50'] * 1000:.1f}  "
+          f"p95 {result['p95'] * 1000:.1f}  p99 {result['p99'] * 1000:.1f}")
+    print(f"  {'stage':24s} {'calls/req':>9s} {'mean ms':>9s} {'ms/req':>8s}")
+    accounted = 0.0
+    for stage, (count, seconds) in result["stages"].items():
+        if not count:
+            continue
+        per_request = seconds / requests
+        if stage in IN_REQUEST:
+            accounted += per_request
+        print(f"  {stage:24s} {count / requests:9.2f} {seconds / count * 1000:9.2f} {per_request * 1000:8.2f}")
+    overhead = max(result["mean"] - accounted, 0.0)
+    print(f"  {'HTTP/graph/loop wait':24s} {'':9s} {'':9s} {overhead * 1000:8.2f}")
+    for error in result["errors"][:3]:
+        print(f"  error: {error}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", default="1,8,32,128", help="comma-separated concurrent student counts")
+    parser.add_argument("--turns", type=int, default=5, help="turns per student")
+    parser.add_argument("--latency", type=float, default=0.2, help="simulated seconds per LLM call")
+    parser.add_argument("--rtt-ms", type=float, default=5.0, help="simulated Firestore round trip")
+    parser.add_argument("--rpm", type=float, default=0.0,
+                        help="per-model request budget for the LLM rate limiter (0: unlimited)")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's per-turn logging")
+    args = parser.parse_args()
+    # Read when agents.rate_limit is imported: the fake model has no quota unless one is given
+    os.environ["LLM_RPM_LIMITS"] = ""
+    os.environ["LLM_DEFAULT_RPM"] = str(args.rpm)
+
+    install_fake_llms(latency=args.latency)
+    import main as app_module
+    from database import get_db
+
+    get_db().db = InMemoryFirestore(latency=args.rtt_ms / 1000)
+
+    print(f"LLM {args.latency * 1000:.0f} ms/call, Firestore {args.rtt_ms:.0f} ms/round trip, "
+          f"{args.turns} turns per student, LLM budget {f'{args.rpm:.0f} rpm' if args.rpm else 'unlimited'}")
+    results = {}
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with app_module.lifespan(app_module.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for level in (int(x) for x in args.levels.split(",")):
+                quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+                with quiet:
+                    results[level] = await run_level(client, level, args.turns)
+                print_level(level, results[level])
+
+    if any(result["errors"] for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,117 @@
+"""
+Batch mastery engine throughput vs the scalar update_mastery loop.
+
+    python -m benchmarks.bench_mastery --events 1000000 --students 20000 --topics 7
+
+The scalar path replays the first --scalar-events events (a full 1M-event
+scalar replay takes a while); every one of them must match the batch result
+exactly — score, ELO, BKT, status, attempts and per-student global score.
+
+The same prefix is also replayed through update_mastery_incremental (the O(1)
+running-aggregate path the evaluator node uses); its aggregates are checked
+against a from-scratch recomputation and its global scores against the
+scalar ones.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml.mastery import check_aggregate, update_mastery, update_mastery_incremental
+from ml.mastery_batch import update_mastery_batch
+
+TOPICS = ["DSA", "OOP", "CN", "DBMS", "Physics", "Math", "Chemistry", "Compilers", "OS", "Statistics"]
+
+
+def make_events(n: int, students: int, topics: int, seed: int = 11):
+    rng = random.Random(seed)
+    student_ids = [f"s{rng.randrange(students)}" for _ in range(n)]
+    topic_names = [TOPICS[rng.randrange(topics)] for _ in range(n)]
+    scores = [rng.randint(0, 10) for _ in range(n)]
+    return student_ids, topic_names, scores
+
+
+def scalar_replay(student_ids, topics, scores):
+    mastery = {}
+    global_scores = {}
+    per_event = []
+    for student, topic, correctness in zip(student_ids, topics, scores):
+        levels = mastery.setdefault(student, {})
+        updated, global_scores[student] = update_mastery(levels.get(topic, {}), topic, correctness, levels)
+        levels[topic] = updated
+        per_event.append((updated["score"], updated["elo_score"], updated["bkt_score"], updated["status"]))
+    return per_event, mastery, global_scores
+
+
+def incremental_replay(student_ids, topics, scores):
+    mastery = {}
+    aggregates = {}
+    global_scores = {}
+    for student, topic, correctness in zip(student_ids, topics, scores):
+        levels = mastery.setdefault(student, {})
+        levels[topic], aggregates[student], global_scores[student] = update_mastery_incremental(
+            levels.get(topic), correctness, aggregates.get(student)
+        )
+    return mastery, aggregates, global_scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--students", type=int, default=20_000)
+    parser.add_argument("--topics", type=int, default=7)
+    parser.add_argument("--scalar-events", type=int, default=200_000)
+    args = parser.parse_args()
+
+    student_ids, topics, scores = make_events(args.events, args.students, args.topics)
+
+    start = time.perf_counter()
+    result = update_mastery_batch(student_ids, topics, scores)
+    batch_s = time.perf_counter() - start
+
+    m = min(args.scalar_events, args.events)
+    start = time.perf_counter()
+    per_event, mastery, global_scores = scalar_replay(student_ids[:m], topics[:m], scores[:m])
+    scalar_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    inc_mastery, inc_aggregates, inc_globals = incremental_replay(student_ids[:m], topics[:m], scores[:m])
+    incremental_s = time.perf_counter() - start
+
+    print(f"{args.events:,} events, {args.students:,} students × {args.topics} topics")
+    print(f"batch  : {batch_s:7.2f} s  {args.events / batch_s:12,.0f} events/s")
+    print(f"scalar : {scalar_s:7.2f} s  {m / scalar_s:12,.0f} events/s  (first {m:,} events)")
+    print(f"incr.  : {incremental_s:7.2f} s  {m / incremental_s:12,.0f} events/s  (first {m:,} events)")
+    print(f"speedup: {(args.events / batch_s) / (m / scalar_s):.1f}x")
+
+    # Exactness: replay the same prefix through the batch engine
+    prefix = update_mastery_batch(student_ids[:m], topics[:m], scores[:m])
+    mismatches = sum(
+        1 for i, (score, elo, bkt, status) in enumerate(per_event)
+        if (score, elo, bkt, status) != (prefix.event_scores[i], prefix.event_elo[i], prefix.event_bkt[i], prefix.event_status[i])
+    )
+    for student, levels in mastery.items():
+        for topic, doc in levels.items():
+            batch_doc = prefix.mastery[student][topic]
+            if any(doc[k] != batch_doc[k] for k in ("score", "elo_score", "bkt_score", "attempts", "status", "last_correctness")):
+                mismatches += 1
+        if global_scores[student] != prefix.global_scores[student]:
+            mismatches += 1
+
+    drifted = sum(1 for student, levels in inc_mastery.items() if check_aggregate(levels, inc_aggregates[student]))
+    print(f"incremental aggregates vs from-scratch: {'OK' if drifted == 0 else f'{drifted} DRIFTED'}")
+    mismatches += drifted
+    # The running sum adds in a different order than a fresh average, so allow
+    # one unit in the 4th decimal after rounding
+    mismatches += sum(1 for student, score in global_scores.items() if abs(score - inc_globals[student]) > 1.5e-4)
+    print(f"exactness vs scalar path: {'OK' if mismatches == 0 else f'{mismatches} MISMATCHES'}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""
+Microbenchmark regression suite for the pure-Python code that runs on every turn.
+
+    python -m benchmarks.bench_micro                   # compare against baselines.json
+    python -m benchmarks.bench_micro --update          # re-record baselines on this machine
+    python -m benchmarks.bench_micro --only sentiment  # cases whose name contains "sentiment"
+
+Each case is timed over --repeats runs (each auto-sized to ~20 ms), every
+run paired with a run of a fixed pure-Python calibration workload; the
+median case/calibration ratio is the case's machine-normalized cost. Baselines store that ratio, so a baseline recorded on a laptop is
+still meaningful on a CI runner. Exits non-zero when any case is more than
+--threshold (default 25%) slower than its baseline.
+
+Corpora are built from a fixed seed: short chat messages, long pasted
+transcripts, sessions of hundreds of messages and mastery dicts with up to
+200 topics.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-placeholder")
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+DEFAULT_THRESHOLD = 0.25
+TARGET_RUN_SECONDS = 0.02
+
+WORDS = (
+    "linked list node pointer head tail insert delete search binary tree heap stack queue hash "
+    "table collision recursion base case memoization dynamic programming graph edge vertex "
+    "traversal breadth depth first sort merge quick pivot complexity amortized normalization "
+    "index transaction tcp handshake packet cache eviction latency"
+).split()
+PHRASES = [
+    "I don't get it", "this makes sense now", "I'm confused", "thanks!", "I give up",
+    "can you explain", "what is", "got it", "this is so frustrating", "I'm not sure",
+]
+
+
+# ---------------------------------------------------------------------------
+# Corpora
+# ---------------------------------------------------------------------------
+
+def _sentence(rng: random.Random, words: int) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    if rng.random() < 0.5:
+        text = f"{rng.choice(PHRASES)} {text}"
+    return text
+
+
+def short_messages(rng: random.Random, count: int = 200) -> List[str]:
+    return [_sentence(rng, rng.randint(3, 25)) for _ in range(count)]
+
+
+def long_transcript(rng: random.Random, words: int = 1500) -> str:
+    """A pasted block of notes or code discussion — the worst case per message."""
+    return ". ".join(_sentence(rng, 15) for _ in range(words // 15))
+
+
+def session_messages(rng: random.Random, count: int) -> list:
+    return [
+        HumanMessage(content=_sentence(rng, 12)) if i % 2 == 0 else AIMessage(content=_sentence(rng, 120))
+        for i in range(count)
+    ]
+
+
+def mastery_dict(rng: random.Random, topics: int) -> Dict[str, dict]:
+    return {
+        f"topic-{i}": {
+            "score": round(rng.random(), 4),
+            "attempts": rng.randint(1, 40),
+            "status": "learning",
+            "last_updated": "2025-03-01T10:00:00",
+            "learning_objectives_met": [f"objective-{j}" for j in range(rng.randint(0, 4))],
+        }
+        for i in range(topics)
+    }
+
+
+def session_state(rng: random.Random, messages: int, topics: int) -> dict:
+    mastery = mastery_dict(rng, topics)
+    return {
+        "messages": session_messages(rng, messages),
+        "student_id": "student-1",
+        "session_id": "session-1",
+        "current_topic": "topic-0",
+        "current_module": "Intro",
+        "mastery_levels": mastery,
+        "mastery_aggregate": {"sum": 0.0, "weight": 0.0, "count": topics},
+        "global_mastery_score": 0.42,
+        "frustration_level": 0.2,
+        "engagement_score": 0.8,
+        "sentiment": "neutral",
+        "syllabus": [f"module-{i}" for i in range(12)],
+        "remaining_objectives": [f"objective-{i}" for i in range(20)],
+        "next_agent": "tutor",
+        "last_agent": "tutor",
+        "active_intervention": False,
+        "intervention_reason": None,
+        "priority_level": 4,
+        "last_evaluation_result": {"correctness_score": 7, "feedback": "good"},
+        "gold_standard_answer": None,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Cases: name → setup() returning the zero-argument callable to time
+# ---------------------------------------------------------------------------
+
+def _sentiment_short():
+    from ml.sentiment import analyze_sentiment
+
+    messages = short_messages(random.Random(1))
+    return lambda: [analyze_sentiment(m) for m in messages]
+
+
+def _sentiment_long():
+    from ml.sentiment import analyze_sentiment
+
+    text = long_transcript(random.Random(2))
+    return lambda: analyze_sentiment(text)
+
+
+def _frustration_decay():
+    from ml.sentiment import update_frustration_with_decay
+
+    rng = random.Random(3)
+    signals = [rng.random() for _ in range(1000)]
+
+    def run():
+        level = 0.0
+        for signal in signals:
+            level = update_frustration_with_decay(level, signal)
+        return level
+    return run
+
+
+def _mastery(topics: int):
+    """The evaluator node's update: one topic against the running aggregate."""
+    def setup():
+        from ml.mastery import aggregate_from_levels, update_mastery_incremental
+
+        mastery = mastery_dict(random.Random(4), topics)
+        aggregate = aggregate_from_levels(mastery)
+        return lambda: update_mastery_incremental(mastery["topic-0"], 7, aggregate)
+    return setup
+
+
+def _split_payload(messages: int, topics: int):
+    """A turn's save: session doc plus the turn's two new log messages."""
+    def setup():
+        from database import _split_session_payload
+
+        state = session_state(random.Random(5), messages, topics)
+        state["message_cursor"] = messages - 2
+        return lambda: _split_session_payload(state)
+    return setup
+
+
+def _restore_messages():
+    from database import _message_to_firestore
+    from main import _restore_messages as restore
+
+    raw = [_message_to_firestore(m) for m in session_messages(random.Random(6), 400)]
+    return lambda: restore(raw)
+
+
+def _conversation_history():
+    from agents.tutor import _get_conversation_history
+
+    state = {"messages": session_messages(random.Random(7), 400), "conversation_summary": "x" * 1200}
+    return lambda: _get_conversation_history(state, max_turns=8)
+
+
+def _last_human_text():
+    from agents.tutor import _get_last_human_text
+
+    state = {"messages": session_messages(random.Random(8), 400)}
+    return lambda: _get_last_human_text(state)
+
+
+CASES: Dict[str, Callable[[], Callable]] = {
+    "sentiment.analyze_200_short": _sentiment_short,
+    "sentiment.analyze_long_transcript": _sentiment_long,
+    "sentiment.frustration_decay_1000": _frustration_decay,
+    "mastery.incremental_5_topics": _mastery(5),
+    "mastery.incremental_200_topics": _mastery(200),
+    "firestore.split_payload_20_msgs_5_topics": _split_payload(20, 5),
+    "firestore.split_payload_400_msgs_200_topics": _split_payload(400, 200),
+    "main.restore_400_messages": _restore_messages,
+    "tutor.conversation_history_400": _conversation_history,
+    "tutor.last_human_text_400": _last_human_text,
+}
+
+
+# ---------------------------------------------------------------------------
+# Timing
+# ---------------------------------------------------------------------------
+
+def _calibration():
+    """Fixed mix of dict, string and float work — the machine's speed reference."""
+    table = {}
+    for i in range(2000):
+        table[f"key-{i}"] = i * 1.5
+    words = " ".join(sorted(table)).split()
+    return sum(table[w] for w in words) / len(words)
+
+
+def _loops(fn: Callable) -> int:
+    """Calls per timed run so that one run takes ~TARGET_RUN_SECONDS."""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= TARGET_RUN_SECONDS / 4:
+            return max(1, int(loops * TARGET_RUN_SECONDS / elapsed))
+        loops *= 2
+
+
+def _run(fn: Callable, loops: int) -> float:
+    start = time.perf_counter()
+    for _ in range(loops):
+        fn()
+    return (time.perf_counter() - start) / loops
+
+
+def measure(names: List[str], repeats: int) -> Tuple[float, Dict[str, Tuple[float, float]]]:
+    """
+    (calibration seconds, case → (seconds per call, normalized)). Every case run
+    is paired with a calibration run right before it and the median ratio is
+    kept, so drift in machine speed (frequency scaling, noisy neighbours)
+    cancels out instead of skewing every ratio.
+    """
+    calls = {name: CASES[name]() for name in names}  # setup (imports, corpora) outside timing
+    calibration_loops = _loops(_calibration)
+    calibrations: List[float] = []
+    results = {}
+    for name, fn in calls.items():
+        loops = _loops(fn)
+        seconds, ratios = [], []
+        for _ in range(repeats):
+            reference = _run(_calibration, calibration_loops)
+            elapsed = _run(fn, loops)
+            calibrations.append(reference)
+            seconds.append(elapsed)
+            ratios.append(elapsed / reference)
+        results[name] = (statistics.median(seconds), statistics.median(ratios))
+    return statistics.median(calibrations), results
+
+
+def load_baselines() -> dict:
+    try:
+        with open(BASELINES_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_baselines(calibration: float, timings: Dict[str, Tuple[float, float]], previous: dict):
+    cases = dict(previous.get("cases", {}))
+    for name, (seconds, normalized) in timings.items():
+        cases[name] = {"normalized": round(normalized, 5), "us": round(seconds * 1e6, 2)}
+    data = {
+        "recorded_on": {"python": platform.python_version(), "machine": platform.machine(),
+                        "calibration_us": round(calibration * 1e6, 2)},
+        "cases": dict(sorted(cases.items())),
+    }
+    with open(BASELINES_PATH, "w") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--update", action="store_true", help="record new baselines instead of checking")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--repeats", type=int, default=9, help="timed runs per case (median ratio is kept)")
+    parser.add_argument("--only", default="", help="run cases whose name contains this string")
+    args = parser.parse_args()
+
+    names = [name for name in CASES if args.only in name]
+    if not names:
+        sys.exit(f"no case matches {args.only!r}")
+    calibration, timings = measure(names, args.repeats)
+    baselines = load_baselines()
+
+    if args.update:
+        save_baselines(calibration, timings, baselines)
+        print(f"calibration {calibration * 1e6:.1f} µs; recorded {len(timings)} baselines in {BASELINES_PATH}")
+        return
+
+    recorded = baselines.get("cases", {})
+    print(f"calibration {calibration * 1e6:.1f} µs (baseline machine "
+          f"{baselines.get('recorded_on', {}).get('calibration_us', '?')} µs), threshold {args.threshold:.0%}")
+    print(f"{'case':44s} {'µs/call':>10s} {'normalized':>11s} {'baseline':>9s} {'change':>8s}")
+    regressions = []
+    for name in names:
+        seconds, normalized = timings[name]
+        baseline = recorded.get(name, {}).get("normalized")
+        if baseline is None:
+            print(f"{name:44s} {seconds * 1e6:10.2f} {normalized:11.5f} {'—':>9s} {'new':>8s}")
+            continue
+        change = normalized / baseline - 1
+        flag = ""
+        if change > args.threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:44s} {seconds * 1e6:10.2f} {normalized:11.5f} {baseline:9.5f} {change:+8.1%}{flag}")
+
+    if regressions:
+        print(f"\n{len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}: "
+              f"{', '.join(regressions)}")
+        sys.exit(1)
+    print("\nOK: no regressions")
+
+
+if __name__ == "__main__":
+    main()
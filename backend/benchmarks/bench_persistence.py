@@ -0,0 +1,186 @@
+"""
+Firestore round trips per turn: one set() per document vs the per-turn unit of
+work (one WriteBatch) vs write-behind coalescing in AsyncFirebaseDB.
+
+    python -m benchmarks.bench_persistence --sessions 50 --turns 20 --rtt-ms 5
+
+Runs against benchmarks.fakes.InMemoryFirestore (no emulator needed). Every
+third turn is an evaluation, so it also writes the topic's mastery document
+and the student's summary. Turns of a session arrive --gap-ms apart, i.e.
+faster than a save completes, which is when coalescing kicks in. Each mode's
+final documents are checked against the per-document baseline.
+
+A last check drives main._persist_turn with one injected WriteBatch failure
+and verifies the reloaded session has every message: the failed turn's log
+entries are rewritten by the next save instead of being skipped.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-placeholder")
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from benchmarks.fakes import InMemoryFirestore
+from database import AsyncFirebaseDB, FirebaseDB
+
+
+def make_db(rtt: float) -> FirebaseDB:
+    db = FirebaseDB.__new__(FirebaseDB)  # skip credential lookup
+    db.db = InMemoryFirestore(latency=rtt)
+    return db
+
+
+def turn_states(session: int, turns: int):
+    """Successive final states of one session, as main._persist_turn sees them."""
+    messages = []
+    mastery = {}
+    for turn in range(turns):
+        cursor = len(messages)
+        messages = [*messages, HumanMessage(content=f"question {turn}"), AIMessage(content=f"answer {turn} " * 40)]
+        evaluated = turn % 3 == 2
+        if evaluated:
+            mastery = {**mastery, "DSA": {"score": round(0.3 + turn / 100, 4), "attempts": turn // 3 + 1}}
+        yield {
+            "messages": messages,
+            "message_cursor": cursor,
+            "student_id": f"s{session}",
+            "session_id": f"sess{session}",
+            "current_topic": "DSA",
+            "last_agent": "evaluator" if evaluated else "tutor",
+            "mastery_levels": mastery,
+            "global_mastery_score": mastery.get("DSA", {}).get("score", 0.0),
+        }
+
+
+def run_per_document(db: FirebaseDB, sessions: int, turns: int):
+    for s in range(sessions):
+        for state in turn_states(s, turns):
+            for ref, data, merge in db._session_writes(f"s{s}", f"sess{s}", state):
+                ref.set(data, merge=merge)
+
+
+def run_unit_of_work(db: FirebaseDB, sessions: int, turns: int):
+    for s in range(sessions):
+        for state in turn_states(s, turns):
+            db.save_student_session_state(f"s{s}", f"sess{s}", state)
+
+
+async def run_async(db: FirebaseDB, sessions: int, turns: int, gap: float, window: float):
+    async_db = AsyncFirebaseDB(db=db, max_workers=16, flush_window=window)
+
+    async def session(s: int):
+        for state in turn_states(s, turns):
+            async_db.save_in_background(f"s{s}", f"sess{s}", state)
+            await asyncio.sleep(gap)
+
+    await asyncio.gather(*(session(s) for s in range(sessions)))
+    await async_db.aclose()
+    return async_db.stats()
+
+
+async def run_failed_commit(db: FirebaseDB, turns: int, fail_turn: int, gap: float) -> dict:
+    """Turns of one session through main._persist_turn (the hot-cache path), the
+    commit of turn `fail_turn` failing once; returns the session reloaded from the store."""
+    import main
+    from cache import session_cache
+
+    async_db = AsyncFirebaseDB(db=db, max_workers=4)
+    main.async_db, saved_db = async_db, main.async_db
+    key = ("s-fail", "sess-fail")
+    session_cache.invalidate(key)
+    try:
+        live = {"messages": [], "message_cursor": 0, "summarized_count": 0,
+                "student_id": key[0], "session_id": key[1]}
+        for turn in range(turns):
+            live = session_cache.get(key) or live
+            final = {**live, "messages": [*live["messages"], HumanMessage(content=f"question {turn}"),
+                                          AIMessage(content=f"answer {turn}")]}
+            db.db.fail_commits = 1 if turn == fail_turn else 0
+            with contextlib.redirect_stdout(io.StringIO()):  # the failed save logs its error
+                main._persist_turn(key[0], key[1], final)
+                await asyncio.sleep(gap)
+            live = final
+        await async_db.aclose()
+    finally:
+        main.async_db = saved_db
+        session_cache.invalidate(key)
+    return db.get_student_session_state(*key)
+
+
+def check_failed_commit(turns: int = 4, fail_turn: int = 1) -> bool:
+    """Every message reaches the log, with the cursor matching it, whether the next
+    turn arrives after the failed commit (gap) or while it is in flight (no gap)."""
+    ok = True
+    for gap in (0.05, 0.0):
+        db = make_db(0.005)
+        state = asyncio.run(run_failed_commit(db, turns, fail_turn, gap))
+        seqs = [m["seq"] for m in state.get("messages", [])]
+        good = seqs == list(range(2 * turns)) and state.get("message_cursor") == 2 * turns
+        ok &= good
+        print(f"commit failure on turn {fail_turn + 1}/{turns}, next turn {'after' if gap else 'during'} it: "
+              f"cursor {state.get('message_cursor')}, log seqs {seqs} {'OK' if good else 'LOST MESSAGES'}")
+    return ok
+
+
+def snapshot(store: InMemoryFirestore):
+    """Final documents, minus wall-clock fields."""
+    return {
+        path: {k: v for k, v in doc.items() if k != "updated_at"}
+        for path, doc in store.docs.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--rtt-ms", type=float, default=5.0, help="simulated latency per round trip")
+    parser.add_argument("--gap-ms", type=float, default=2.0, help="time between a session's turns")
+    parser.add_argument("--window-ms", type=float, default=25.0, help="flush window for the last mode")
+    args = parser.parse_args()
+    rtt, gap = args.rtt_ms / 1000, args.gap_ms / 1000
+    total_turns = args.sessions * args.turns
+
+    modes = [
+        ("one set() per document", lambda db: run_per_document(db, args.sessions, args.turns)),
+        ("unit of work (sync)", lambda db: run_unit_of_work(db, args.sessions, args.turns)),
+        ("write-behind, no window", lambda db: asyncio.run(run_async(db, args.sessions, args.turns, gap, 0.0))),
+        (f"write-behind, {args.window_ms:.0f} ms window",
+         lambda db: asyncio.run(run_async(db, args.sessions, args.turns, gap, args.window_ms / 1000))),
+    ]
+
+    print(f"{args.sessions} sessions × {args.turns} turns, {args.rtt_ms:.0f} ms per round trip, "
+          f"turns {args.gap_ms:.0f} ms apart")
+    print(f"{'mode':32s} {'round trips/turn':>17s} {'doc writes/turn':>16s} {'wall s':>8s}")
+    baseline = None
+    failed = False
+    for name, run in modes:
+        db = make_db(rtt)
+        start = time.perf_counter()
+        run(db)
+        elapsed = time.perf_counter() - start
+        store = db.db
+        print(f"{name:32s} {store.round_trips / total_turns:17.2f} {store.writes / total_turns:16.2f} {elapsed:8.2f}")
+        final = snapshot(store)
+        if baseline is None:
+            baseline = final
+        elif final != baseline:
+            failed = True
+            print(f"  MISMATCH: final documents differ from the per-document baseline")
+
+    print(f"final documents identical across modes: {'NO' if failed else 'OK'}")
+    failed |= not check_failed_commit()
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Microbenchmark: ml.sentiment automaton vs the previous per-phrase substring scan.
+
+    python -m benchmarks.bench_sentiment --messages 20000
+
+Also reports how many messages score differently; every difference should be
+a word-boundary or nested-phrase case the old scan got wrong.
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml.sentiment import (
+    CONFUSION_LEXICON,
+    FRUSTRATION_LEXICON,
+    POSITIVE_LEXICON,
+    analyze_sentiment,
+    analyze_sentiment_batch,
+)
+
+SAMPLE_MESSAGES = [
+    "what is a linked list",
+    "hi",
+    "explain normalization in dbms",
+    "I give up, this is useless",
+    "Thanks! That makes sense now, I understand recursion.",
+    "I'm not sure what you mean by amortized complexity, can you explain?",
+    "This hardware question is hard to follow",
+    "i know nothing about tcp handshakes",
+    "Can you grade my answer: a stack is LIFO and a queue is FIFO.",
+    "What should I learn next after binary search trees?",
+    "honestly this is so confused and frustrating, I've been stuck for an hour on dynamic programming",
+    "ok cool, got it. what does the big O of heapify look like?",
+    "Newton's second law says force equals mass times acceleration, is this correct?",
+    "maybe I think the answer is 42 but I'm not sure",
+]
+
+
+def legacy_analyze_sentiment(text: str):
+    """The pre-automaton implementation: one substring scan per lexicon phrase."""
+    normalized = re.sub(r"\s+", " ", re.sub(r"[^\w\s']", " ", text.lower())).strip()
+    frustration_score = positive_score = confusion_score = 0.0
+    for phrase, weight in FRUSTRATION_LEXICON.items():
+        if phrase in normalized:
+            frustration_score = max(frustration_score, weight)
+    for phrase, weight in POSITIVE_LEXICON.items():
+        if phrase in normalized:
+            positive_score = max(positive_score, weight)
+    for phrase, weight in CONFUSION_LEXICON.items():
+        if phrase in normalized:
+            confusion_score = max(confusion_score, weight)
+    net_frustration = max(0.0, min(1.0, frustration_score - positive_score * 0.5))
+    word_count = len(text.split())
+    length_boost = min(0.3, word_count / 100)
+    engagement = max(0.0, min(1.0, (positive_score * 0.6) + length_boost + 0.4 - (net_frustration * 0.4)))
+    if net_frustration >= 0.6:
+        sentiment = "negative"
+    elif net_frustration >= 0.3 or confusion_score >= 0.2:
+        sentiment = "confused"
+    elif positive_score >= 0.25:
+        sentiment = "positive"
+    else:
+        sentiment = "neutral"
+    return (
+        float(int(net_frustration * 1000 + 0.5) / 1000.0),
+        sentiment,
+        float(int(engagement * 1000 + 0.5) / 1000.0),
+    )
+
+
+def build_corpus(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(n):
+        parts = rng.sample(SAMPLE_MESSAGES, k=rng.choice((1, 1, 1, 2, 4)))
+        corpus.append(" ".join(parts))
+    return corpus
+
+
+def timed(fn, corpus, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(corpus)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.messages)
+    legacy = timed(lambda c: [legacy_analyze_sentiment(t) for t in c], corpus)
+    single = timed(lambda c: [analyze_sentiment(t) for t in c], corpus)
+    batch = timed(analyze_sentiment_batch, corpus)
+
+    n = len(corpus)
+    print(f"{n} messages")
+    print(f"{'legacy substring scan':<24} {legacy * 1e6 / n:8.2f} µs/msg")
+    print(f"{'automaton':<24} {single * 1e6 / n:8.2f} µs/msg  ({legacy / single:.2f}x)")
+    print(f"{'automaton (batch API)':<24} {batch * 1e6 / n:8.2f} µs/msg  ({legacy / batch:.2f}x)")
+
+    differing = [t for t in SAMPLE_MESSAGES if legacy_analyze_sentiment(t) != analyze_sentiment(t)]
+    print(f"\n{len(differing)}/{len(SAMPLE_MESSAGES)} sample messages score differently:")
+    for text in differing:
+        print(f"  {text!r}: {legacy_analyze_sentiment(text)} → {analyze_sentiment(text)}")
+
+
+if __name__ == "__main__":
+    main()
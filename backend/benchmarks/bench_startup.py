@@ -0,0 +1,124 @@
+"""
+Cold-start benchmark: `python -X importtime` breakdown of `import main`, plus
+time-to-first-request (process spawn → first /chat response, with a fake LLM).
+
+    python -m benchmarks.bench_startup                 # print the report
+    python -m benchmarks.bench_startup --write-report  # refresh benchmarks/reports/startup.txt
+
+Exits non-zero if the median time-to-first-request exceeds --target-ms.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_PATH = os.path.join(BACKEND_DIR, "benchmarks", "reports", "startup.txt")
+DEFAULT_TARGET_MS = 2500
+
+FIRST_REQUEST_SCRIPT = """
+import sys
+sys.path.insert(0, ".")
+from benchmarks.fakes import install_fake_llms
+install_fake_llms()
+import main
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    client.post("/chat", json={"message": "what is a linked list", "student_id": "bench"})
+    print("FIRST_RESPONSE", flush=True)
+"""
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env.pop("FIREBASE_SERVICE_ACCOUNT_PATH", None)  # measure without network I/O
+    env["LLM_RPM_LIMITS"] = ""  # the fake model has no quota
+    env["LLM_DEFAULT_RPM"] = "0"
+    return env
+
+
+def import_profile():
+    """Returns (total_us, {module: (self_us, cumulative_us)}) for one `import main`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, env=_env(), capture_output=True, text=True, check=True,
+    )
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules["main"][1], modules
+
+
+def time_to_first_request() -> float:
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", FIRST_REQUEST_SCRIPT],
+        cwd=BACKEND_DIR, env=_env(), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    for line in proc.stdout:
+        if line.startswith("FIRST_RESPONSE"):
+            elapsed = time.perf_counter() - start
+            break
+    else:
+        raise RuntimeError("first request never completed")
+    proc.wait()
+    return elapsed * 1000
+
+
+def build_report(runs: int, top: int):
+    profiles = [import_profile() for _ in range(runs)]
+    totals = sorted(total for total, _ in profiles)
+    _, modules = profiles[len(profiles) // 2]
+
+    by_package = defaultdict(int)
+    for name, (self_us, _) in modules.items():
+        by_package[name.split(".")[0]] += self_us
+
+    ttfr = sorted(time_to_first_request() for _ in range(runs))
+
+    lines = [
+        f"import main: median {statistics.median(totals) / 1000:.0f} ms over {runs} runs "
+        f"(min {totals[0] / 1000:.0f} ms)",
+        f"time to first /chat response: median {statistics.median(ttfr):.0f} ms (min {ttfr[0]:.0f} ms)",
+        "",
+        f"top {top} packages by self time:",
+    ]
+    for package, self_us in sorted(by_package.items(), key=lambda kv: -kv[1])[:top]:
+        lines.append(f"  {self_us / 1000:8.1f} ms  {package}")
+    lines += ["", f"top {top} modules by cumulative time:"]
+    for name, (_, cumulative_us) in sorted(modules.items(), key=lambda kv: -kv[1][1])[:top]:
+        lines.append(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+    return "\n".join(lines) + "\n", statistics.median(ttfr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--target-ms", type=float, default=DEFAULT_TARGET_MS,
+                        help="time-to-first-request budget (median)")
+    parser.add_argument("--write-report", action="store_true", help=f"write {os.path.relpath(REPORT_PATH, BACKEND_DIR)}")
+    args = parser.parse_args()
+
+    report, ttfr_ms = build_report(args.runs, args.top)
+    print(report)
+    if args.write_report:
+        os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+        with open(REPORT_PATH, "w") as f:
+            f.write(report)
+
+    if ttfr_ms > args.target_ms:
+        print(f"FAIL: time to first request {ttfr_ms:.0f} ms exceeds target {args.target_ms:.0f} ms")
+        sys.exit(1)
+    print(f"OK: time to first request within {args.target_ms:.0f} ms target")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Deterministic stand-ins used by the benchmarks — no network, no API key.
+
+FakeChatModel is a real LangChain chat model (so graph streaming, callbacks and
+ainvoke behave as in production) whose latency is simulated: time.sleep on the
+sync path, asyncio.sleep on the async path.
+
+InMemoryFirestore stands in for the Firestore client used by FirebaseDB
+(documents, sub-collections, merge sets, WriteBatch, get_all, DELETE_FIELD) and counts
+round trips, each of which can be given a simulated latency.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+def default_responder(messages: List[BaseMessage]) -> str:
+    """Routing JSON for the MetaAgent prompt, a short canned answer for everyone else."""
+    system = str(messages[0].content) if messages else ""
+    if "Master Orchestrator" in system:
+        return json.dumps({
+            "intent": "learn",
+            "detected_topic": "DSA",
+            "frustration_signal": 0.1,
+            "next_agent": "tutor",
+            "reasoning": "Student wants to learn a concept.",
+            "suggested_objective": None,
+        })
+    return (
+        "A **linked list** is a chain of nodes where each node points to the next. "
+        "Correctness Score: 7/10. What do you think happens when you delete the head?"
+    )
+
+
+class FakeChatModel(BaseChatModel):
+    latency: float = 0.0                # seconds per call (time to last token)
+    responder: Callable[[List[BaseMessage]], str] = default_responder
+    chunk_words: int = 8                # words per streamed chunk
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.responder(messages)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.responder(messages)))])
+
+    def _chunks(self, messages) -> List[str]:
+        words = self.responder(messages).split(" ")
+        return [
+            " ".join(words[i:i + self.chunk_words]) + (" " if i + self.chunk_words < len(words) else "")
+            for i in range(0, len(words), self.chunk_words)
+        ]
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        chunks = self._chunks(messages)
+        for text in chunks:
+            time.sleep(self.latency / max(len(chunks), 1))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        chunks = self._chunks(messages)
+        for text in chunks:
+            await asyncio.sleep(self.latency / max(len(chunks), 1))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                await run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+
+def install_fake_llms(latency: float = 0.0, responder: Optional[Callable] = None):
+    """Make the LLM registry hand every agent a FakeChatModel."""
+    from agents.llm import llm_registry
+
+    fake = FakeChatModel(latency=latency, responder=responder or default_responder)
+    llm_registry.set_factory(lambda model, temperature: fake)
+    return fake
+
+
+# ---------------------------------------------------------------------------
+# In-memory Firestore
+# ---------------------------------------------------------------------------
+
+class _Snapshot:
+    def __init__(self, doc_id: str, data: Optional[dict], reference: Optional["_DocumentRef"] = None):
+        self.id = doc_id
+        self.reference = reference
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self) -> Optional[dict]:
+        return dict(self._data) if self._data is not None else None
+
+
+class _DocumentRef:
+    def __init__(self, store: "InMemoryFirestore", path: Tuple[str, ...]):
+        self._store = store
+        self.path = path
+        self.id = path[-1]
+
+    def collection(self, name: str) -> "_CollectionRef":
+        return _CollectionRef(self._store, self.path + (name,))
+
+    def get(self) -> _Snapshot:
+        self._store._round_trip()
+        return _Snapshot(self.id, self._store.docs.get(self.path), self)
+
+    def set(self, data: dict, merge: bool = False):
+        self._store._round_trip()
+        self._store._apply(self.path, data, merge)
+
+
+_OPERATORS = {
+    "==": lambda a, b: a == b, "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b, "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b, ">=": lambda a, b: a >= b,
+}
+
+
+class _CollectionRef:
+    def __init__(self, store: "InMemoryFirestore", path: Tuple[str, ...], order: Optional[str] = None,
+                 limit: Optional[int] = None, descending: bool = False, filters: Tuple = ()):
+        self._store = store
+        self.path = path
+        self._order = order
+        self._limit = limit
+        self._descending = descending
+        self._filters = filters  # (field, op, value)
+
+    def _query(self, **changes) -> "_CollectionRef":
+        args = dict(order=self._order, limit=self._limit, descending=self._descending, filters=self._filters)
+        args.update(changes)
+        return _CollectionRef(self._store, self.path, **args)
+
+    def document(self, doc_id: str) -> _DocumentRef:
+        return _DocumentRef(self._store, self.path + (doc_id,))
+
+    def where(self, *args, filter=None) -> "_CollectionRef":
+        field, op, value = (filter.field_path, filter.op_string, filter.value) if filter is not None else args
+        return self._query(filters=self._filters + ((field, op, value),))
+
+    def order_by(self, field: str, direction: str = "ASCENDING") -> "_CollectionRef":
+        return self._query(order=field, descending=direction == "DESCENDING")
+
+    def limit(self, count: int) -> "_CollectionRef":
+        return self._query(limit=count)
+
+    def stream(self) -> List[_Snapshot]:
+        self._store._round_trip()
+        items = [
+            (p[-1], d) for p, d in list(self._store.docs.items())
+            if p[:-1] == self.path
+            and all(f in d and _OPERATORS[op](d[f], v) for f, op, v in self._filters)
+        ]
+        if self._order:
+            items.sort(key=lambda item: item[1][self._order], reverse=self._descending)
+        if self._limit:
+            items = items[:self._limit]
+        return [_Snapshot(doc_id, data, _DocumentRef(self._store, self.path + (doc_id,))) for doc_id, data in items]
+
+
+class _WriteBatch:
+    def __init__(self, store: "InMemoryFirestore"):
+        self._store = store
+        self._ops: List[Tuple[_DocumentRef, dict, bool]] = []
+
+    def set(self, ref: _DocumentRef, data: dict, merge: bool = False):
+        self._ops.append((ref, data, merge))
+
+    def commit(self):
+        if len(self._ops) > 500:
+            raise ValueError("WriteBatch exceeds 500 operations")
+        self._store._round_trip()
+        with self._store._lock:
+            if self._store.fail_commits:
+                self._store.fail_commits -= 1
+                raise RuntimeError("injected WriteBatch failure")
+        for ref, data, merge in self._ops:
+            self._store._apply(ref.path, data, merge)
+
+
+class InMemoryFirestore:
+    """Drop-in for FirebaseDB.db: `db.db = InMemoryFirestore(latency=0.005)`."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.docs: Dict[Tuple[str, ...], dict] = {}
+        self.round_trips = 0
+        self.writes = 0
+        self.fail_commits = 0  # the next N WriteBatch commits raise, as a transient outage would
+        self._lock = threading.Lock()
+
+    def collection(self, name: str) -> _CollectionRef:
+        return _CollectionRef(self, (name,))
+
+    def batch(self) -> _WriteBatch:
+        return _WriteBatch(self)
+
+    def get_all(self, refs: List[_DocumentRef]) -> List[_Snapshot]:
+        """Batched read: every document in one round trip."""
+        self._round_trip()
+        return [_Snapshot(ref.id, self.docs.get(ref.path), ref) for ref in refs]
+
+    def _round_trip(self):
+        with self._lock:
+            self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _apply(self, path: Tuple[str, ...], data: dict, merge: bool):
+        from firebase_admin import firestore
+
+        def merged(current: dict, update: dict) -> dict:
+            for key, value in update.items():
+                if value is firestore.DELETE_FIELD:
+                    current.pop(key, None)
+                elif merge and isinstance(value, dict) and isinstance(current.get(key), dict):
+                    current[key] = merged(dict(current[key]), value)
+                else:
+                    current[key] = value
+            return current
+
+        with self._lock:
+            self.writes += 1
+            base = dict(self.docs.get(path) or {}) if merge else {}
+            self.docs[path] = merged(base, data)
@@ -0,0 +1,127 @@
+"""
+In-process LRU + TTL cache with an optional memory budget.
+
+Used as the hot session cache in front of FirebaseDB: a worker that handled a
+session's previous turn keeps the live AgentState (already-restored message
+objects), so the next turn skips both the Firestore read and _restore_messages.
+Assumes sticky sessions — another worker's writes are only picked up after TTL.
+The MetaAgent also uses it to memoize routing decisions.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        sizeof: Callable[[Any], int] = sys.getsizeof,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._sizeof = sizeof
+        self._data: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()  # key → (value, expires_at, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, _ = entry
+            if expires_at and expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Like get(), but without touching LRU order or the hit/miss counters."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or (entry[1] and entry[1] <= time.monotonic()):
+                return None
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any):
+        size = self._sizeof(value)
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else 0.0
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return  # would evict everything else and still not fit
+            self._data[key] = (value, expires_at, size)
+            self._bytes += size
+            while self._data and (
+                (self.max_entries is not None and len(self._data) > self.max_entries)
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Hashable):
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def estimate_state_size(state: dict) -> int:
+    """Cheap approximate footprint of an AgentState in bytes (dominated by message text)."""
+    size = 1024  # dict + scalar fields
+    for msg in state.get("messages", []) or []:
+        size += 240 + len(str(getattr(msg, "content", msg)))
+    for key in ("mastery_levels", "syllabus", "remaining_objectives", "last_evaluation_result"):
+        value = state.get(key)
+        if value:
+            size += len(str(value))
+    return size
+
+
+session_cache = TTLCache(
+    max_bytes=int(os.getenv("SESSION_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("SESSION_CACHE_TTL_SECONDS", "900")),
+    sizeof=estimate_state_size,
+)
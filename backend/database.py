@@ -1,13 +1,27 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
+import asyncio
+import functools
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 
+from metrics import FIRESTORE_ERRORS, timed_firestore
+from ml.mastery import aggregate_from_levels, global_score_from_aggregate
+
 load_dotenv()
 
+_MAX_BATCH_WRITES = 450  # Firestore caps a WriteBatch at 500 operations
+
+
 class FirebaseDB:
     def __init__(self):
         """Initialize Firebase with graceful degradation if credentials are missing."""
+        # Imported here: the Firestore client stack is a large share of cold-start time
+        import firebase_admin
+        from firebase_admin import credentials, firestore
+
         self.db = None
 
         if firebase_admin._apps:
@@ -40,70 +54,278 @@ class FirebaseDB:
     # Session State
     # ------------------------------------------------------------------
 
+    def _session_ref(self, student_id: str, session_id: str):
+        return (
+            self.db.collection("students")
+            .document(student_id)
+            .collection("sessions")
+            .document(session_id)
+        )
+
+    @timed_firestore("get_student_session_state")
     def get_student_session_state(self, student_id: str, session_id: str) -> dict:
         if not self._is_available():
             return {}
         try:
-            doc_ref = (
-                self.db.collection("students")
-                .document(student_id)
-                .collection("sessions")
-                .document(session_id)
-            )
+            doc_ref = self._session_ref(student_id, session_id)
             doc = doc_ref.get()
-            return doc.to_dict() if doc.exists else {}
+            if not doc.exists:
+                return {}
+            return self._with_message_log(doc_ref, doc.to_dict())
+        except Exception as e:
+            _report_error("get_student_session_state", e)
+            return {}
+
+    @timed_firestore("get_session_documents")
+    def get_session_documents(self, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], dict]:
+        """Session documents for many (student_id, session_id) pairs in one get_all
+        round trip; missing sessions are absent. Message logs are not loaded — see
+        load_message_log."""
+        if not self._is_available() or not keys:
+            return {}
+        try:
+            refs = {self._session_ref(*key).path: key for key in keys}
+            snapshots = self.db.get_all([self._session_ref(*key) for key in keys])
+            return {refs[snap.reference.path]: snap.to_dict() for snap in snapshots if snap.exists}
         except Exception as e:
-            print(f"[Firebase] get_student_session_state error: {e}")
+            _report_error("get_session_documents", e)
             return {}
 
+    @timed_firestore("load_message_log")
+    def load_message_log(self, student_id: str, session_id: str, data: dict) -> dict:
+        """Complete a session document from get_session_documents with its message log."""
+        try:
+            return self._with_message_log(self._session_ref(student_id, session_id), data)
+        except Exception as e:
+            _report_error("load_message_log", e)
+            return {}
+
+    def _with_message_log(self, doc_ref, data: dict) -> dict:
+        if "messages" not in data:
+            # Messages live in an append-only log, one document per message;
+            # only the tail past the summarized prefix is loaded
+            log = doc_ref.collection("messages")
+            summarized = int(data.get("summarized_count", 0) or 0)
+            if summarized:
+                from google.cloud.firestore_v1 import FieldFilter
+
+                log = log.where(filter=FieldFilter("seq", ">=", summarized))
+            data["messages"] = [m.to_dict() for m in log.order_by("seq").stream()]
+        return data
+
+    @timed_firestore("save_student_session_state")
     def save_student_session_state(self, student_id: str, session_id: str, state_data: dict):
+        """
+        Persist one turn: append the messages past state_data["message_cursor"]
+        to the session's message log and merge the scalar state (plus the new
+        cursor) into the session document. Callers advance their in-memory
+        cursor only once the save has landed.
+        """
         if not self._is_available():
             return
         try:
-            # Firestore cannot store arbitrary Python objects; filter to safe types.
-            safe_data = _sanitize_for_firestore(state_data)
-            doc_ref = (
-                self.db.collection("students")
-                .document(student_id)
-                .collection("sessions")
-                .document(session_id)
-            )
-            doc_ref.set(safe_data, merge=True)
+            uow = self.unit_of_work()
+            uow.save_session(student_id, session_id, state_data)
+            uow.commit()
         except Exception as e:
-            print(f"[Firebase] save_student_session_state error: {e}")
+            _report_error("save_student_session_state", e)
+
+    def unit_of_work(self) -> "UnitOfWork":
+        return UnitOfWork(self)
+
+    def _session_writes(self, student_id: str, session_id: str, state_data: dict) -> list:
+        """(ref, data, merge) writes for one turn: new log messages, mastery, session doc."""
+        # Firestore cannot store arbitrary Python objects; filter to safe types.
+        session_doc, new_messages, start_seq = _split_session_payload(state_data)
+        doc_ref = self._session_ref(student_id, session_id)
+        log_ref = doc_ref.collection("messages")
+
+        writes = [
+            (log_ref.document(f"{seq:08d}"), {"seq": seq, **msg}, False)
+            for seq, msg in enumerate(new_messages, start=start_seq)
+        ]
+        # Evaluation turns keep the student's mastery documents (and global score) current
+        evaluated = _evaluated_mastery(state_data)
+        if evaluated:
+            global_score = global_score_from_aggregate(
+                state_data.get("mastery_aggregate") or aggregate_from_levels(state_data.get("mastery_levels"))
+            )
+            writes += self._mastery_writes(student_id, evaluated, global_score)
+        # Session doc last: its cursor must never point past the written log
+        writes.append((doc_ref, session_doc, True))
+        return writes
+
+    @timed_firestore("commit")
+    def _commit_writes(self, writes: list):
+        """Commit (ref, data, merge) writes as WriteBatches within Firestore's 500-op limit."""
+        for i in range(0, len(writes), _MAX_BATCH_WRITES):
+            batch = self.db.batch()
+            for ref, data, merge in writes[i:i + _MAX_BATCH_WRITES]:
+                batch.set(ref, data, merge=merge)
+            batch.commit()
 
     # ------------------------------------------------------------------
     # Mastery Tracking
     # ------------------------------------------------------------------
 
+    def _summary_ref(self, student_id: str):
+        # One denormalized document with every topic: /mastery reads it in a single get()
+        return (
+            self.db.collection("students")
+            .document(student_id)
+            .collection("summary")
+            .document("mastery")
+        )
+
+    def _mastery_writes(self, student_id: str, topics: Dict[str, dict],
+                        global_score: Optional[float] = None) -> list:
+        """(ref, data, merge) writes for changed topics: each topic document plus the
+        summary. Without a global_score the summary's stored score is dropped (it no
+        longer matches the topics) and the next read recomputes it."""
+        from firebase_admin import firestore
+
+        mastery_col = self.db.collection("students").document(student_id).collection("mastery")
+        writes = [(mastery_col.document(topic), data, True) for topic, data in topics.items()]
+        # merge=True merges the nested "topics" map key by key, so other topics survive
+        summary = {
+            "topics": topics,
+            "global_mastery_score": firestore.DELETE_FIELD if global_score is None else global_score,
+            "updated_at": _now(),
+        }
+        writes.append((self._summary_ref(student_id), summary, True))
+        return writes
+
+    @timed_firestore("update_mastery")
     def update_mastery(self, student_id: str, topic: str, mastery_data: dict):
         if not self._is_available():
             return
         try:
-            doc_ref = (
-                self.db.collection("students")
-                .document(student_id)
-                .collection("mastery")
-                .document(topic)
-            )
-            doc_ref.set(mastery_data, merge=True)
+            self._commit_writes(self._mastery_writes(student_id, {topic: mastery_data}))
         except Exception as e:
-            print(f"[Firebase] update_mastery error: {e}")
+            _report_error("update_mastery", e)
 
-    def get_mastery(self, student_id: str) -> dict:
+    @timed_firestore("bulk_update_mastery")
+    def bulk_update_mastery(self, mastery_by_student: Dict[str, Dict[str, dict]]) -> int:
+        """Merge many students' topic documents (and summaries) in WriteBatches; returns
+        topic documents written. Unlike the per-turn writes, errors propagate so a
+        backfill can stop and resume."""
         if not self._is_available():
-            return {}
+            return 0
+        writes = []
+        for student_id, topics in mastery_by_student.items():
+            writes += self._mastery_writes(student_id, topics)
+        self._commit_writes(writes)
+        return len(writes) - len(mastery_by_student)
+
+    def get_mastery(self, student_id: str, materialize: bool = True) -> dict:
+        """Topic → mastery document."""
+        return self.get_mastery_summary(student_id, materialize)["topics"]
+
+    @timed_firestore("get_mastery")
+    def get_mastery_summary(self, student_id: str, materialize: bool = True) -> dict:
+        """{"topics", "global_mastery_score"}: one read of the summary document,
+        falling back to streaming the mastery collection (and, if materialize,
+        writing the summary from it so the next read is a single get).
+
+        Only a summary built from the collection is marked complete; one created
+        by a topic write may be missing older topic documents and is rebuilt."""
+        if not self._is_available():
+            return {"topics": {}, "global_mastery_score": 0.0}
         try:
-            docs = (
-                self.db.collection("students")
-                .document(student_id)
-                .collection("mastery")
-                .stream()
-            )
-            return {doc.id: doc.to_dict() for doc in docs}
+            summary = self._summary_ref(student_id).get()
+            data = (summary.to_dict() or {}) if summary.exists else {}
+            complete = bool(data.get("complete"))
+            if complete:
+                topics = data.get("topics", {})
+                if "global_mastery_score" in data:
+                    return {"topics": topics, "global_mastery_score": data["global_mastery_score"]}
+            else:
+                docs = (
+                    self.db.collection("students")
+                    .document(student_id)
+                    .collection("mastery")
+                    .stream()
+                )
+                topics = {doc.id: doc.to_dict() for doc in docs}
+
+            global_score = global_score_from_aggregate(aggregate_from_levels(topics))
+            if topics and materialize:
+                update = {"global_mastery_score": global_score}
+                if not complete:
+                    update.update(topics=topics, complete=True, updated_at=_now())
+                self._summary_ref(student_id).set(update, merge=True)
+            return {"topics": topics, "global_mastery_score": global_score}
         except Exception as e:
-            print(f"[Firebase] get_mastery error: {e}")
-            return {}
+            _report_error("get_mastery", e)
+            return {"topics": {}, "global_mastery_score": 0.0}
+
+
+class UnitOfWork:
+    """
+    Writes collected for one commit — a turn's message log, mastery documents
+    and session document — sent as one WriteBatch, i.e. one round trip (up to
+    450 writes). Several turns of a session can share a unit: writes to the
+    same document are folded together in order, so each document is written
+    once per commit however many turns it coalesces.
+    """
+
+    def __init__(self, db: FirebaseDB):
+        self._db = db
+        self._writes: Dict[Any, list] = {}  # document path → [ref, data, merge], in write order
+        self.turns = 0
+        self.on_commit: List[Callable[[], None]] = []  # run by AsyncFirebaseDB once the commit has landed
+
+    def set(self, ref, data: dict, merge: bool = False):
+        previous = self._writes.pop(ref.path, None)  # re-inserted last: keeps "session doc last"
+        if previous is not None and merge:
+            # merge onto an earlier write: a full set stays a full set
+            data = _merge_fields(previous[1], data, keep_deletes=previous[2])
+            merge = previous[2]
+        self._writes[ref.path] = [ref, data, merge]
+
+    def save_session(self, student_id: str, session_id: str, state_data: dict):
+        if self._db._is_available():
+            for ref, data, merge in self._db._session_writes(student_id, session_id, state_data):
+                self.set(ref, data, merge)
+        self.turns += 1
+
+    def update_mastery(self, student_id: str, topics: Dict[str, dict]):
+        if self._db._is_available():
+            for ref, data, merge in self._db._mastery_writes(student_id, topics):
+                self.set(ref, data, merge)
+
+    def commit(self) -> int:
+        """Commit everything collected so far; returns the number of document writes."""
+        writes = [tuple(w) for w in self._writes.values()]
+        self._writes.clear()
+        if writes:
+            self._db._commit_writes(writes)
+        return len(writes)
+
+    def __len__(self) -> int:
+        return len(self._writes)
+
+
+def _merge_fields(base: dict, update: dict, keep_deletes: bool) -> dict:
+    """Firestore merge semantics applied locally: nested maps merge key by key.
+    DELETE_FIELD sentinels are kept for a merge write and applied for a full set."""
+    from firebase_admin import firestore
+
+    merged = dict(base)
+    for key, value in update.items():
+        if value is firestore.DELETE_FIELD and not keep_deletes:
+            merged.pop(key, None)
+        elif isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge_fields(merged[key], value, keep_deletes)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _message_to_firestore(m) -> dict:
+    if hasattr(m, "content"):
+        return {"role": getattr(m, "type", "unknown"), "content": getattr(m, "content", str(m))}
+    return {"role": "unknown", "content": str(m)}
 
 
 def _sanitize_for_firestore(data: dict) -> dict:
@@ -112,11 +334,7 @@ def _sanitize_for_firestore(data: dict) -> dict:
     for k, v in data.items():
         if k == "messages":
             # Store messages as list of plain dicts
-            safe[k] = [
-                {"role": getattr(m, "type", "unknown"), "content": getattr(m, "content", str(m))}
-                if hasattr(m, "content") else {"role": "unknown", "content": str(m)}
-                for m in v
-            ]
+            safe[k] = [_message_to_firestore(m) for m in v]
         elif isinstance(v, dict):
             safe[k] = _sanitize_for_firestore(v)
         elif isinstance(v, list):
@@ -128,5 +346,236 @@ def _sanitize_for_firestore(data: dict) -> dict:
     return safe
 
 
-# Singleton instance
-db_manager = FirebaseDB()
+def _report_error(operation: str, e: Exception):
+    FIRESTORE_ERRORS.labels(operation).inc()
+    print(f"[Firebase] {operation} error: {e}")
+
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+
+def _evaluated_mastery(state_data: dict) -> Dict[str, dict]:
+    """The topic the evaluator just scored ({} on any other turn)."""
+    if state_data.get("last_agent") != "evaluator":
+        return {}
+    topic = state_data.get("current_topic") or "General"
+    mastery_data = (state_data.get("mastery_levels") or {}).get(topic)
+    if not isinstance(mastery_data, dict):
+        return {}
+    return {topic: _sanitize_for_firestore(mastery_data)}
+
+
+def _split_session_payload(state_data: dict) -> Tuple[dict, list, int]:
+    """
+    Split an AgentState into (session_doc, new_message_dicts, first_new_seq).
+    Only messages past the persisted cursor are serialized; the session doc
+    carries the scalar state and the advanced cursor, and drops any legacy
+    inline transcript.
+    """
+    messages = state_data.get("messages", []) or []
+    cursor = int(state_data.get("message_cursor", 0) or 0)
+    # messages[0] is log entry `offset`: earlier entries are folded into the summary
+    offset = int(state_data.get("summarized_count", 0) or 0)
+    start = max(cursor - offset, 0)
+    session_doc = _sanitize_for_firestore({k: v for k, v in state_data.items() if k != "messages"})
+    session_doc["message_cursor"] = offset + len(messages)
+    from firebase_admin import firestore
+
+    session_doc["messages"] = firestore.DELETE_FIELD
+    return session_doc, [_message_to_firestore(m) for m in messages[start:]], offset + start
+
+
+class AsyncFirebaseDB:
+    """
+    Async facade over FirebaseDB for the request hot path.
+
+    The Firestore client is blocking, so every call runs on a small bounded
+    executor instead of the event loop. Saves are write-behind: they are
+    scheduled as background tasks, chained per session so they land in order,
+    and a read of a session waits for its pending save (read-your-writes).
+
+    Each save is a UnitOfWork committed in one round trip. Turns of a session
+    that arrive while its commit is still waiting — for the previous commit to
+    land, or for flush_window seconds — join that same unit instead of
+    queueing their own.
+    """
+
+    def __init__(self, db: Optional[FirebaseDB] = None, max_workers: int = 8, flush_window: float = 0.0):
+        self._db = db  # None → the shared FirebaseDB, created on first use
+        self._max_workers = max_workers
+        self.flush_window = flush_window
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._open: Dict[Tuple[str, str], UnitOfWork] = {}  # not yet committing; new turns join these
+        self.commits = 0
+        self.turns_saved = 0
+        self.turns_coalesced = 0
+
+    async def _run(self, fn, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="firestore")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args))
+
+    async def connect(self):
+        """Initialize Firebase off the event loop (called from the app's startup step)."""
+        await self._run(lambda: self.db)
+
+    @property
+    def db(self) -> FirebaseDB:
+        if self._db is None:
+            self._db = get_db()
+        return self._db
+
+    async def get_student_session_state(self, student_id: str, session_id: str) -> dict:
+        pending = self._pending.get((student_id, session_id))
+        if pending is not None:
+            # A save for this session is still in flight — never read stale state.
+            await asyncio.wait([pending])
+        return await self._run(self.db.get_student_session_state, student_id, session_id)
+
+    async def get_student_session_states(self, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], dict]:
+        """Many sessions at once: one batched read of the session documents, then
+        the message logs concurrently. Sessions that don't exist are absent."""
+        if not keys:
+            return {}
+        pending = [self._pending[key] for key in keys if key in self._pending]
+        if pending:
+            await asyncio.wait(pending)
+        docs = await self._run(self.db.get_session_documents, keys)
+        states = await asyncio.gather(*(
+            self._run(self.db.load_message_log, student_id, session_id, data)
+            for (student_id, session_id), data in docs.items()
+        ))
+        return {key: state for key, state in zip(docs, states) if state}
+
+    async def get_mastery(self, student_id: str) -> dict:
+        return await self._run(self.db.get_mastery, student_id)
+
+    async def get_mastery_summary(self, student_id: str) -> dict:
+        return await self._run(self.db.get_mastery_summary, student_id)
+
+    async def update_mastery(self, student_id: str, topic: str, mastery_data: dict):
+        await self._run(self.db.update_mastery, student_id, topic, mastery_data)
+
+    def save_in_background(self, student_id: str, session_id: str, state_data: dict,
+                           on_saved: Optional[Callable[[str, str, dict], None]] = None) -> asyncio.Task:
+        """Schedule a write-behind save; returns the task (callers need not await it)."""
+        return self.save_many_in_background([(student_id, session_id, state_data)], on_saved)
+
+    def save_many_in_background(self, turns: List[Tuple[str, str, dict]],
+                                on_saved: Optional[Callable[[str, str, dict], None]] = None
+                                ) -> Optional[asyncio.Task]:
+        """
+        Write-behind save of many turns, in order, as one unit of work (batched
+        writes, one round trip per 450). Turns of a session whose unit is still
+        open join that unit instead. on_saved(student_id, session_id, state_data)
+        is called on the event loop for each turn once its commit has landed —
+        never for a turn whose commit failed. Returns the new unit's task, or
+        the open unit's when every turn joined one.
+        """
+        uow = None
+        joined = None
+        keys = []
+        for student_id, session_id, state_data in turns:
+            key = (student_id, session_id)
+            self.turns_saved += 1
+            open_uow = self._open.get(key)
+            if open_uow is not None and open_uow is not uow:
+                # Serialized now (the state is this turn's snapshot), committed with the open unit
+                open_uow.save_session(student_id, session_id, state_data)
+                if on_saved is not None:
+                    open_uow.on_commit.append(functools.partial(on_saved, student_id, session_id, state_data))
+                self.turns_coalesced += 1
+                joined = self._pending[key]
+                continue
+            if uow is None:
+                uow = self.db.unit_of_work()
+            uow.save_session(student_id, session_id, state_data)
+            if on_saved is not None:
+                uow.on_commit.append(functools.partial(on_saved, student_id, session_id, state_data))
+            if key not in self._open:
+                self._open[key] = uow
+                keys.append(key)
+            else:
+                self.turns_coalesced += 1
+        if uow is None:
+            return joined
+
+        previous = [self._pending[key] for key in keys if key in self._pending]
+
+        async def _save():
+            try:
+                if self.flush_window:
+                    await asyncio.sleep(self.flush_window)
+                if previous:
+                    await asyncio.wait(previous)
+            finally:
+                # From here on new turns start the next unit
+                for key in keys:
+                    if self._open.get(key) is uow:
+                        del self._open[key]
+            if await self._run(uow.commit):
+                self.commits += 1
+            for callback in uow.on_commit:
+                callback()
+
+        task = asyncio.create_task(_save())
+        for key in keys:
+            self._pending[key] = task
+        task.add_done_callback(lambda t: self._forget(keys, t))
+        return task
+
+    def _forget(self, keys: List[Tuple[str, str]], task: asyncio.Task):
+        for key in keys:
+            if self._pending.get(key) is task:
+                del self._pending[key]
+        if not task.cancelled() and task.exception() is not None:
+            print(f"[Firebase] background save error: {task.exception()}")
+
+    async def flush(self):
+        """Wait for every pending background save to finish."""
+        while self._pending:
+            await asyncio.wait(list(self._pending.values()))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "turns_saved": self.turns_saved,
+            "turns_coalesced": self.turns_coalesced,
+            "commits": self.commits,
+            "flush_window_ms": self.flush_window * 1000,
+        }
+
+    async def aclose(self):
+        await self.flush()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+# Singleton instances — FirebaseDB is built lazily so importing this module stays cheap
+_db_manager: Optional[FirebaseDB] = None
+_db_lock = threading.Lock()
+
+
+def get_db() -> FirebaseDB:
+    global _db_manager
+    if _db_manager is None:
+        with _db_lock:
+            if _db_manager is None:
+                _db_manager = FirebaseDB()
+    return _db_manager
+
+
+def __getattr__(name: str):
+    # Backwards compatibility: `from database import db_manager`
+    if name == "db_manager":
+        return get_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+async_db = AsyncFirebaseDB(
+    max_workers=int(os.getenv("FIRESTORE_MAX_WORKERS", "8")),
+    flush_window=float(os.getenv("FIRESTORE_FLUSH_WINDOW_MS", "0")) / 1000,
+)
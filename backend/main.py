@@ -1,14 +1,50 @@
+import asyncio
+import json
+import os
 import uuid
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
-from langchain_core.messages import HumanMessage, AIMessage
+from typing import Dict, List, Optional, Tuple
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk
 
-from orchestrator import app as graph_app
-from database import db_manager
+from orchestrator import get_app, SPECIALIST_AGENTS
+from agents.meta_agent import meta_agent
+from agents.tutor import tutor_agent
+from agents.prompts import prompt_stats
+from agents.rate_limit import llm_limits
+from speculation import speculator
+from database import async_db
+from cache import session_cache
+from ml.mastery import aggregate_from_levels, global_score_from_aggregate
+from metrics import IN_FLIGHT, llm_metrics_handler, render_latest
 
-app = FastAPI(title="Multi-Agent Educational Copilot API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: nothing heavy happens at import time; build the graph and connect
+    # Firebase here so the first request doesn't pay for it
+    get_app()
+    await async_db.connect()
+    if os.getenv("STARTUP_WARMUP", "0") == "1":
+        _warm_up_llm_clients()
+    yield
+    # Flush write-behind saves so no student turn is lost on shutdown
+    await async_db.aclose()
+
+
+def _warm_up_llm_clients():
+    """Construct every agent's LLM client up front (optional: STARTUP_WARMUP=1)."""
+    for agent in (meta_agent, *SPECIALIST_AGENTS.values()):
+        try:
+            agent.llm
+        except Exception as e:
+            print(f"[Startup] LLM warm-up failed: {e}")
+
+
+app = FastAPI(title="Multi-Agent Educational Copilot API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,6 +55,11 @@ app.add_middleware(
 )
 
 
+# /chat/batch limits: turns per request, and turns running through the graph at once
+CHAT_BATCH_MAX_ITEMS = int(os.getenv("CHAT_BATCH_MAX_ITEMS", "200"))
+CHAT_BATCH_CONCURRENCY = int(os.getenv("CHAT_BATCH_CONCURRENCY", "32"))
+
+
 # ---------------------------------------------------------------------------
 # Request / Response schemas
 # ---------------------------------------------------------------------------
@@ -27,6 +68,7 @@ class ChatRequest(BaseModel):
     message: str
     student_id: str
     session_id: Optional[str] = None
+    bypass_cache: bool = False  # force a fresh LLM response (skip shared response caches)
 
 
 class ChatResponse(BaseModel):
@@ -36,6 +78,23 @@ class ChatResponse(BaseModel):
     state: Optional[dict] = None  # Live state for frontend dashboard
 
 
+class ChatBatchRequest(BaseModel):
+    requests: List[ChatRequest]
+
+
+class ChatBatchItem(BaseModel):
+    index: int  # position in ChatBatchRequest.requests
+    session_id: str
+    response: Optional[ChatResponse] = None
+    error: Optional[str] = None  # set instead of response when this turn failed
+
+
+class ChatBatchResponse(BaseModel):
+    results: List[ChatBatchItem]
+    succeeded: int
+    failed: int
+
+
 # ---------------------------------------------------------------------------
 # Helper: build initial state for a brand-new session
 # ---------------------------------------------------------------------------
@@ -43,11 +102,15 @@ class ChatResponse(BaseModel):
 def _build_initial_state(student_id: str, session_id: str, first_message: str) -> dict:
     return {
         "messages": [HumanMessage(content=first_message)],
+        "message_cursor": 0,
+        "conversation_summary": "",
+        "summarized_count": 0,
         "student_id": student_id,
         "session_id": session_id,
         "current_topic": "General",
         "current_module": "Intro",
         "mastery_levels": {},
+        "mastery_aggregate": {"sum": 0.0, "weight": 0.0, "count": 0},
         "global_mastery_score": 0.0,
         "frustration_level": 0.0,
         "engagement_score": 1.0,
@@ -64,6 +127,18 @@ def _build_initial_state(student_id: str, session_id: str, first_message: str) -
     }
 
 
+async def _new_session_state(student_id: str, session_id: str, first_message: str) -> dict:
+    """Initial state seeded with the student's stored mastery, so the session's running
+    aggregate (and the global score saved from it) covers every topic, not just this session's."""
+    state = _build_initial_state(student_id, session_id, first_message)
+    topics = (await async_db.get_mastery_summary(student_id))["topics"]
+    if topics:
+        state["mastery_levels"] = dict(topics)
+        state["mastery_aggregate"] = aggregate_from_levels(topics)
+        state["global_mastery_score"] = global_score_from_aggregate(state["mastery_aggregate"])
+    return state
+
+
 def _restore_messages(raw_messages: list) -> list:
     """Convert Firestore-stored message dicts back to LangChain message objects."""
     restored = []
@@ -80,49 +155,49 @@ def _restore_messages(raw_messages: list) -> list:
     return restored
 
 
-# ---------------------------------------------------------------------------
-# Endpoints
-# ---------------------------------------------------------------------------
+async def _load_state(student_id: str, session_id: str, message: str) -> dict:
+    """Return the turn's input state: cached live state if hot, else restored from Firebase."""
+    cached = session_cache.get((student_id, session_id))
+    if cached is not None:
+        return _with_new_message(cached, message)
 
-@app.get("/")
-def read_root():
-    return {"message": "Multi-Agent Educational Copilot API", "status": "running"}
+    # Load existing session state from Firebase (returns {} if unavailable)
+    existing_state = await async_db.get_student_session_state(student_id, session_id)
+    if not existing_state:
+        return await _new_session_state(student_id, session_id, message)
 
+    # Restore message objects from stored dicts, then append the new user message
+    existing_state["messages"] = _restore_messages(existing_state.get("messages", []))
+    existing_state["messages"].append(HumanMessage(content=message))
+    return existing_state
 
-@app.get("/health")
-def health_check():
-    return {"status": "ok", "agents": ["tutor", "planner", "evaluator", "coach"]}
 
+def _with_new_message(live_state: dict, message: str) -> dict:
+    # Copy the message list so a failed turn never leaks into the cached state
+    return {**live_state, "messages": [*live_state.get("messages", []), HumanMessage(content=message)]}
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
-    session_id = request.session_id or str(uuid.uuid4())
 
-    # 1. Load existing session state from Firebase (returns {} if unavailable)
-    existing_state = db_manager.get_student_session_state(request.student_id, session_id)
+def _persist_turn(student_id: str, session_id: str, final_state: dict):
+    """Write-behind save of the turn's new messages (errors are logged, not raised);
+    the live state stays hot, its cursor advanced once the save has landed."""
+    session_cache.put((student_id, session_id), final_state)
+    async_db.save_in_background(student_id, session_id, final_state, on_saved=_advance_cursor)
 
-    # 2. Build or restore state
-    if not existing_state:
-        state = _build_initial_state(request.student_id, session_id, request.message)
-    else:
-        # Restore message objects from stored dicts
-        if "messages" in existing_state:
-            existing_state["messages"] = _restore_messages(existing_state["messages"])
-        # Append the new user message
-        existing_state["messages"].append(HumanMessage(content=request.message))
-        state = existing_state
 
-    # 3. Run the LangGraph orchestrator
-    try:
-        final_state = await graph_app.ainvoke(state)
-    except Exception as e:
-        print(f"[Orchestrator] Error: {e}")
-        raise HTTPException(status_code=500, detail=f"Orchestrator error: {str(e)}")
+def _advance_cursor(student_id: str, session_id: str, saved_state: dict):
+    """
+    A turn's commit landed: move the hot state's cursor past its messages so
+    the next save appends only newer ones. Until then saves start from the last
+    durable cursor and rewrite the log entries in between (keyed by seq, so
+    idempotent) — a failed commit is repaired by the next save, not left as a gap.
+    """
+    persisted = int(saved_state.get("summarized_count", 0) or 0) + len(saved_state.get("messages", []))
+    live = session_cache.peek((student_id, session_id))
+    if live is not None and int(live.get("message_cursor", 0) or 0) < persisted:
+        live["message_cursor"] = persisted
 
-    # 4. Persist updated state to Firebase (fire-and-forget; errors are logged, not raised)
-    db_manager.save_student_session_state(request.student_id, session_id, final_state)
 
-    # 5. Return the last AI message
+def _build_chat_response(final_state: dict, session_id: str) -> ChatResponse:
     last_ai_message = ""
     for msg in reversed(final_state.get("messages", [])):
         if isinstance(msg, AIMessage):
@@ -151,8 +226,215 @@ async def chat(request: ChatRequest):
     })
 
 
+def _graph_config(request: ChatRequest) -> dict:
+    # llm_metrics_handler reaches every node's LLM call through the runnable context
+    return {"configurable": {"bypass_cache": request.bypass_cache}, "callbacks": [llm_metrics_handler]}
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+# ---------------------------------------------------------------------------
+# Endpoints
+# ---------------------------------------------------------------------------
+
+@app.get("/")
+def read_root():
+    return {"message": "Multi-Agent Educational Copilot API", "status": "running"}
+
+
+@app.get("/health")
+def health_check():
+    return {"status": "ok", "agents": ["tutor", "planner", "evaluator", "coach"]}
+
+
+@app.get("/stats")
+def stats():
+    """In-process cache and routing counters for this worker."""
+    return {
+        "session_cache": session_cache.stats(),
+        "routing": meta_agent.routing_stats(),
+        "speculation": speculator.stats(),
+        "persistence": async_db.stats(),
+        "tutor_response_cache": tutor_agent.response_cache.stats(),
+        "prompts": prompt_stats.stats(),
+        "llm_limits": llm_limits.stats(),
+    }
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint."""
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
+
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest):
+    with IN_FLIGHT.labels("/chat").track_inprogress():
+        return await _chat_turn(request)
+
+
+async def _chat_turn(request: ChatRequest) -> ChatResponse:
+    session_id = request.session_id or str(uuid.uuid4())
+
+    # 1-2. Load (hot cache → Firebase) and append the new user message
+    state = await _load_state(request.student_id, session_id, request.message)
+
+    # 3. Run the LangGraph orchestrator
+    try:
+        final_state = await get_app().ainvoke(state, config=_graph_config(request))
+    except Exception as e:
+        print(f"[Orchestrator] Error: {e}")
+        raise HTTPException(status_code=500, detail=f"Orchestrator error: {str(e)}")
+
+    # 4. Persist to Firebase (write-behind) and keep the live state hot
+    _persist_turn(request.student_id, session_id, final_state)
+
+    # 5. Return the last AI message
+    return _build_chat_response(final_state, session_id)
+
+
+@app.post("/chat/batch", response_model=ChatBatchResponse)
+async def chat_batch(batch: ChatBatchRequest):
+    """
+    Many students' turns in one request (a classroom burst). Session states are
+    prefetched in one batched read, turns run concurrently through the graph
+    (at most CHAT_BATCH_CONCURRENCY at a time; turns of the same session in
+    order), and all results are saved as one batched write-behind commit. A
+    failed turn is reported in its item and does not affect the others.
+    """
+    if len(batch.requests) > CHAT_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {CHAT_BATCH_MAX_ITEMS} turns per batch")
+    with IN_FLIGHT.labels("/chat/batch").track_inprogress():
+        return await _chat_batch(batch.requests)
+
+
+async def _chat_batch(requests: List[ChatRequest]) -> ChatBatchResponse:
+    by_session: Dict[Tuple[str, str], List[int]] = {}
+    for i, request in enumerate(requests):
+        key = (request.student_id, request.session_id or str(uuid.uuid4()))
+        by_session.setdefault(key, []).append(i)
+
+    # 1. Load: hot sessions from the cache, the rest in one batched read
+    live = {key: session_cache.peek(key) for key in by_session}
+    stored = await async_db.get_student_session_states([key for key, state in live.items() if state is None])
+
+    results: List[Optional[ChatBatchItem]] = [None] * len(requests)
+    finished: List[Tuple[str, str, dict]] = []
+    semaphore = asyncio.Semaphore(CHAT_BATCH_CONCURRENCY)
+
+    def fail(i: int, session_id: str, stage: str, e: Exception):
+        print(f"[Orchestrator] Batch item {i} {stage.lower()} error: {e}")
+        results[i] = ChatBatchItem(index=i, session_id=session_id, error=f"{stage} error: {str(e)}")
+
+    async def run_session(key: Tuple[str, str], indexes: List[int]):
+        # Every failure stays with its own item(s): the rest of the batch still answers and saves
+        student_id, session_id = key
+        try:
+            if live[key] is None and stored.get(key):
+                live[key] = {**stored[key], "messages": _restore_messages(stored[key].get("messages", []))}
+        except Exception as e:
+            for i in indexes:  # never start over on a fresh state: its save would clobber the history
+                fail(i, session_id, "Session load", e)
+            return
+        for i in indexes:
+            request = requests[i]
+            # 2. Run the graph
+            try:
+                if live[key] is not None:
+                    state = _with_new_message(live[key], request.message)
+                else:
+                    state = await _new_session_state(student_id, session_id, request.message)
+                async with semaphore:
+                    final_state = await get_app().ainvoke(state, config=_graph_config(request))
+            except Exception as e:
+                fail(i, session_id, "Orchestrator", e)
+                continue
+            finished.append((student_id, session_id, final_state))
+            live[key] = final_state
+            try:
+                session_cache.put(key, final_state)
+                results[i] = ChatBatchItem(
+                    index=i, session_id=session_id, response=_build_chat_response(final_state, session_id),
+                )
+            except Exception as e:
+                fail(i, session_id, "Response", e)
+
+    await asyncio.gather(*(run_session(key, indexes) for key, indexes in by_session.items()))
+
+    # 3. Persist every finished turn as one write-behind unit (batched writes)
+    if finished:
+        async_db.save_many_in_background(finished, on_saved=_advance_cursor)
+    failed = sum(1 for item in results if item.error is not None)
+    return ChatBatchResponse(results=results, succeeded=len(results) - failed, failed=failed)
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Server-sent events variant of /chat:
+      event: route  → MetaAgent routing decision (as soon as it is made)
+      event: token  → specialist output chunks as the LLM produces them
+      event: done   → the final ChatResponse payload (after state is persisted)
+      event: error  → orchestrator failure
+    """
+    session_id = request.session_id or str(uuid.uuid4())
+    state = await _load_state(request.student_id, session_id, request.message)
+
+    async def event_stream():
+        with IN_FLIGHT.labels("/chat/stream").track_inprogress():
+            async for event in _turn_events():
+                yield event
+
+    async def _turn_events():
+        final_state = state
+        streamed_nodes = set()
+        try:
+            async for mode, chunk in get_app().astream(
+                state, config=_graph_config(request), stream_mode=["updates", "messages", "values"]
+            ):
+                if mode == "values":
+                    final_state = chunk
+                elif mode == "updates" and "meta_agent" in chunk:
+                    decision = chunk["meta_agent"] or {}
+                    yield _sse("route", {
+                        "agent": decision.get("next_agent"),
+                        "sentiment": decision.get("sentiment"),
+                        "frustration_level": decision.get("frustration_level"),
+                        "current_topic": decision.get("current_topic", state.get("current_topic")),
+                        "session_id": session_id,
+                    })
+                elif mode == "messages":
+                    message_chunk, metadata = chunk
+                    node = metadata.get("langgraph_node")
+                    if node in ("meta_agent", "compact") or not message_chunk.content:
+                        continue
+                    # Whole messages are echoed once a node returns; only forward one
+                    # if the model did not stream (e.g. a non-streaming client)
+                    if isinstance(message_chunk, AIMessageChunk):
+                        streamed_nodes.add(node)
+                    elif node in streamed_nodes:
+                        continue
+                    yield _sse("token", {"agent": node, "content": message_chunk.content})
+        except Exception as e:
+            print(f"[Orchestrator] Stream error: {e}")
+            yield _sse("error", {"detail": f"Orchestrator error: {str(e)}"})
+            return
+
+        _persist_turn(request.student_id, session_id, final_state)
+        yield _sse("done", _build_chat_response(final_state, session_id).model_dump())
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 @app.get("/mastery/{student_id}")
-def get_mastery(student_id: str):
+async def get_mastery(student_id: str):
     """Mastery dashboard endpoint for the frontend."""
-    data = db_manager.get_mastery(student_id)
-    return {"student_id": student_id, "mastery": data}
+    summary = await async_db.get_mastery_summary(student_id)
+    return {
+        "student_id": student_id,
+        "mastery": summary["topics"],
+        "global_mastery_score": summary["global_mastery_score"],
+    }
@@ -0,0 +1,165 @@
+"""
+Prometheus metrics, served on GET /metrics.
+
+  copilot_node_latency_seconds{node}              LangGraph node wall time
+  copilot_llm_latency_seconds{agent,model}        one chat-model call (agent = graph node)
+  copilot_llm_errors_total{agent,model}
+  copilot_llm_queue_wait_seconds{model,priority}  time a call waited for the rate limiter
+  copilot_llm_critical_slo_misses_total{model}    critical (coach) calls that waited past the SLO
+  copilot_llm_concurrency_limit{model}            current AIMD window (agents/rate_limit.py)
+  copilot_llm_throttled_total{model}              quota errors (429) from the provider
+  copilot_firestore_latency_seconds{operation}    one FirebaseDB call
+  copilot_firestore_errors_total{operation}
+  copilot_routes_total{agent}                     turns routed to each specialist
+  copilot_routing_decisions_total{source}         how routing was decided: local|cached|llm|fallback
+  copilot_routing_json_fallbacks_total            routing replies _extract_json could not parse
+  copilot_prompt_tokens{agent}                    estimated tokens per rendered prompt (agents/prompts.py)
+  copilot_prompt_chars_total{agent}               prompt characters sent
+  copilot_prompt_static_chars_total{agent}        of which from the precompiled static prefix
+  copilot_requests_in_flight{endpoint}
+
+With several worker processes, set PROMETHEUS_MULTIPROC_DIR and /metrics
+aggregates across them.
+"""
+
+import asyncio
+import functools
+import os
+import time
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+
+# LLM calls run from ~100 ms to tens of seconds; Firestore from ~5 ms to seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40)
+
+NODE_LATENCY = Histogram(
+    "copilot_node_latency_seconds", "LangGraph node latency", ["node"], buckets=LATENCY_BUCKETS,
+)
+LLM_LATENCY = Histogram(
+    "copilot_llm_latency_seconds", "Chat model call latency", ["agent", "model"], buckets=LATENCY_BUCKETS,
+)
+LLM_ERRORS = Counter("copilot_llm_errors_total", "Failed chat model calls", ["agent", "model"])
+LLM_QUEUE_WAIT = Histogram(
+    "copilot_llm_queue_wait_seconds", "Time an LLM call waited for the rate limiter", ["model", "priority"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+LLM_CONCURRENCY_LIMIT = Gauge(
+    "copilot_llm_concurrency_limit", "Current AIMD concurrency window", ["model"], multiprocess_mode="livesum",
+)
+LLM_CRITICAL_SLO_MISSES = Counter(
+    "copilot_llm_critical_slo_misses_total", "Critical-priority LLM calls that waited past their SLO", ["model"],
+)
+LLM_THROTTLED = Counter("copilot_llm_throttled_total", "LLM calls rejected for quota (429)", ["model"])
+FIRESTORE_LATENCY = Histogram(
+    "copilot_firestore_latency_seconds", "FirebaseDB call latency", ["operation"], buckets=LATENCY_BUCKETS,
+)
+FIRESTORE_ERRORS = Counter("copilot_firestore_errors_total", "FirebaseDB calls that failed", ["operation"])
+ROUTES = Counter("copilot_routes_total", "Turns routed to each specialist agent", ["agent"])
+ROUTING_DECISIONS = Counter(
+    "copilot_routing_decisions_total", "How the MetaAgent reached its decision", ["source"],
+)
+ROUTING_JSON_FALLBACKS = Counter(
+    "copilot_routing_json_fallbacks_total", "Routing LLM replies that could not be parsed as JSON",
+)
+PROMPT_TOKENS = Histogram(
+    "copilot_prompt_tokens", "Estimated tokens per rendered prompt", ["agent"],
+    buckets=(128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768),
+)
+PROMPT_CHARS = Counter("copilot_prompt_chars_total", "Characters of rendered prompts", ["agent"])
+PROMPT_STATIC_CHARS = Counter(
+    "copilot_prompt_static_chars_total", "Prompt characters from precompiled static prefixes", ["agent"],
+)
+IN_FLIGHT = Gauge(
+    "copilot_requests_in_flight", "Requests being handled", ["endpoint"], multiprocess_mode="livesum",
+)
+
+
+def timed_node(name: str, fn):
+    """Wrap a sync or async graph node so its wall time lands in NODE_LATENCY.
+    functools.wraps keeps the signature, so LangGraph still passes config."""
+    histogram = NODE_LATENCY.labels(name)
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - start)
+    return wrapper
+
+
+def timed_firestore(operation: str):
+    """Decorator for FirebaseDB methods: latency plus a count of calls that raised."""
+    def decorator(fn):
+        histogram = FIRESTORE_LATENCY.labels(operation)
+        errors = FIRESTORE_ERRORS.labels(operation)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """
+    Times every chat model call made inside a graph run. Passed in the graph
+    config's callbacks, so it reaches each node's llm.ainvoke through the
+    runnable context; the agent label is the calling node (langgraph_node).
+    """
+
+    run_inline = True  # record on the calling thread/loop, no executor hop
+
+    def __init__(self):
+        self._started: Dict[UUID, tuple] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata: Optional[Dict[str, Any]] = None,
+                            **kwargs: Any):
+        metadata = metadata or {}
+        labels = (metadata.get("langgraph_node", "none"), metadata.get("ls_model_name") or "unknown")
+        self._started[run_id] = (labels, time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            labels, start = started
+            LLM_LATENCY.labels(*labels).observe(time.perf_counter() - start)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            LLM_ERRORS.labels(*started[0]).inc()
+
+
+llm_metrics_handler = LLMMetricsHandler()
+
+
+def render_latest():
+    """(body, content_type) for the /metrics endpoint."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,133 @@
+"""
+Local intent + routing classifier (no LLM call).
+
+Combines the sentiment lexicon signal with intent cue patterns to produce the
+same decision object the MetaAgent's LLM returns, plus a confidence in [0, 1].
+The MetaAgent only trusts it when the confidence clears a threshold; anything
+ambiguous still goes to the LLM.
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, punctuation to spaces, collapsed whitespace — for matching and cache keys."""
+    text = text.lower()
+    text = re.sub(r"[^\w\s']", " ", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    return text
+
+
+# ---------------------------------------------------------------------------
+# Intent cues — (pattern, intent, next_agent, confidence)
+# ---------------------------------------------------------------------------
+
+INTENT_CUES: List[Tuple[str, str, str, float]] = [
+    # Evaluation requests
+    (r"\b(grade|check|evaluate|assess|mark|review) (my|this) (answer|solution|code|response|work|attempt)\b", "evaluate", "evaluator", 0.92),
+    (r"\bis (this|my answer|my solution|my code|that) (correct|right|wrong)\b", "evaluate", "evaluator", 0.88),
+    (r"\b(quiz|test) me\b", "evaluate", "evaluator", 0.90),
+    (r"\bhere'?s my (answer|solution|attempt)\b", "evaluate", "evaluator", 0.88),
+    # Planning requests
+    (r"\bwhat should i (learn|study|do|focus on) next\b", "plan", "planner", 0.92),
+    (r"\b(roadmap|study plan|learning path|syllabus|curriculum)\b", "plan", "planner", 0.88),
+    (r"\b(where|how) (do|should) i (start|begin)\b", "plan", "planner", 0.85),
+    (r"\b(make|create|build|give) me an? (plan|schedule)\b", "plan", "planner", 0.90),
+    # Concept questions
+    (r"^(what is|what are|what's|explain|define|describe|how does|how do|why does|why is)\b", "learn", "tutor", 0.85),
+    (r"\b(difference between|can you explain|teach me|help me understand)\b", "learn", "tutor", 0.82),
+]
+
+GREETINGS = re.compile(
+    r"^(hi|hello|hey|hiya|yo|good (morning|afternoon|evening)|thanks|thank you|ok|okay)( there| again| so much)?$"
+)
+
+# Topic keywords → the topic labels the MetaAgent prompt uses. Only terms that
+# mean one thing in a tutoring chat; words like "base", "join" or "limit" are
+# qualified with a phrase or left to the LLM.
+TOPIC_KEYWORDS: Dict[str, List[str]] = {
+    "DSA": ["linked list", "array", "stack", "queue", "binary tree", "binary search tree", "tree traversal",
+            "graph traversal", "shortest path", "min heap", "max heap", "heap sort", "hash table", "hashmap",
+            "sorting algorithm", "binary search", "recursion", "dynamic programming", "big o", "algorithm"],
+    "OOP": ["classes and objects", "abstract class", "object oriented", "inheritance", "polymorphism",
+            "encapsulation", "constructor", "oop"],
+    "CN": ["tcp", "udp", "ip address", "osi", "router", "subnet", "dns", "http", "computer network",
+           "network layer", "network protocol"],
+    "DBMS": ["sql", "database", "normal form", "sql join", "inner join", "outer join", "left join",
+             "database index", "database transaction", "primary key", "foreign key", "dbms", "acid properties"],
+    "Physics": ["velocity", "acceleration", "net force", "momentum", "newton", "kinetic energy",
+                "potential energy", "gravity", "quantum", "thermodynamics", "physics"],
+    "Math": ["derivative", "integral", "matrix", "probability", "equation", "calculus", "algebra",
+             "theorem"],
+    "Chemistry": ["molecule", "atom", "chemical reaction", "chemical bond", "covalent bond", "ionic bond",
+                  "acid base", "acids and bases", "periodic table", "mole concept", "molar mass",
+                  "chemistry", "electron"],
+}
+
+_CUES = [(re.compile(p), intent, agent, conf) for p, intent, agent, conf in INTENT_CUES]
+_TOPICS = [
+    (topic, re.compile(r"\b(" + "|".join(re.escape(k) for k in keywords) + r")s?\b"))
+    for topic, keywords in TOPIC_KEYWORDS.items()
+]
+
+
+def detect_topic(normalized: str) -> Optional[str]:
+    hits = [topic for topic, pattern in _TOPICS if pattern.search(normalized)]
+    return hits[0] if len(hits) == 1 else None  # ambiguous → let the LLM decide
+
+
+def classify_intent(text: str, ml_signal: Tuple[float, str, float],
+                    current_topic: Optional[str] = None) -> Dict:
+    """
+    Returns the MetaAgent decision dict plus "confidence".
+    ml_signal is analyze_sentiment(text): (frustration, sentiment, engagement).
+    A keyword topic never changes the session topic (detected_topic stays None);
+    it only counts toward a tutor route when it matches current_topic.
+    """
+    ml_frustration, ml_sentiment, _ = ml_signal
+    normalized = normalize_text(text)
+    topic = detect_topic(normalized)
+
+    decision = {
+        "intent": "learn",
+        "detected_topic": None,
+        "frustration_signal": ml_frustration,
+        "next_agent": "tutor",
+        "reasoning": "Local classifier: no strong cue",
+        "suggested_objective": None,
+        "confidence": 0.0,
+    }
+
+    # Strong frustration dominates everything (mirrors routing rule 1)
+    if ml_frustration > 0.6:
+        decision.update(intent="frustrated", next_agent="coach", confidence=0.95,
+                        reasoning="Local classifier: strong frustration lexicon match")
+        return decision
+
+    if GREETINGS.match(normalized):
+        decision.update(intent="greeting", confidence=0.90, reasoning="Local classifier: greeting")
+        return decision
+
+    matches = {}
+    for pattern, intent, agent, conf in _CUES:
+        if pattern.search(normalized) and conf > matches.get(agent, (None, 0.0))[1]:
+            matches[agent] = (intent, conf)
+
+    if not matches:
+        if ml_sentiment == "confused":
+            decision.update(intent="confused", next_agent="coach", confidence=0.55,
+                            reasoning="Local classifier: confusion signal without a clear intent")
+        return decision
+
+    agent, (intent, confidence) = max(matches.items(), key=lambda item: item[1][1])
+    if len(matches) > 1:
+        confidence -= 0.25  # conflicting cues, e.g. "explain ... then quiz me"
+    if ml_sentiment in ("confused", "negative"):
+        confidence -= 0.15  # emotional signal the LLM may weigh differently
+    if agent == "tutor" and (topic is None or topic != current_topic):
+        confidence -= 0.15  # new or unknown topic: the LLM decides it
+
+    decision.update(intent=intent, next_agent=agent, confidence=round(max(0.0, confidence), 3),
+                    reasoning=f"Local classifier: '{intent}' cue")
+    return decision
@@ -15,14 +15,20 @@ BKT parameters (Bayesian Knowledge Tracing):
 """
 
 from datetime import datetime
-from typing import Dict, Any, Tuple, List
+from typing import Dict, Any, Tuple, List, Optional
+
+# Shared with ml/mastery_batch.py, so a replay always uses the live parameters
+ELO_K = 0.12    # ELO learning rate
+BKT_PT = 0.10   # learning rate per attempt
+BKT_PG = 0.25   # guess probability
+BKT_PS = 0.10   # slip probability
 
 
 # ---------------------------------------------------------------------------
 # ELO-Inspired Update
 # ---------------------------------------------------------------------------
 
-def elo_update(current_score: float, passed: bool, k: float = 0.12) -> float:
+def elo_update(current_score: float, passed: bool, k: float = ELO_K) -> float:
     """
     ELO-inspired mastery score update.
     - k: learning rate (higher = faster updates)
@@ -47,9 +53,7 @@ def bkt_update(pL: float, correct: bool) -> float:
     pL: current mastery probability
     correct: did the student get it right?
     """
-    pT = 0.10   # learning rate per attempt
-    pG = 0.25   # guess probability
-    pS = 0.10   # slip probability
+    pT, pG, pS = BKT_PT, BKT_PG, BKT_PS
 
     if correct:
         # P(obs | know) = 1 - pS; P(obs | ~know) = pG
@@ -75,16 +79,8 @@ def bkt_update(pL: float, correct: bool) -> float:
 # Combined Update (blend ELO + BKT)
 # ---------------------------------------------------------------------------
 
-def update_mastery(
-    current_mastery: Dict[str, Any],
-    topic: str,
-    correctness_score: int,          # 0–10 from evaluator
-    all_topics_mastery: Dict[str, Any],
-) -> Tuple[Dict[str, Any], float]:
-    """
-    Updates the mastery data for a specific topic.
-    Returns the updated mastery dict for that topic and the global score.
-    """
+def update_topic_mastery(current_mastery: Dict[str, Any], correctness_score: int) -> Dict[str, Any]:
+    """Applies one evaluation (0–10) to a topic's mastery dict; returns the updated dict."""
     passed = correctness_score >= 6  # 6/10 threshold for passing
 
     # Get existing values
@@ -120,6 +116,22 @@ def update_mastery(
         "last_updated": datetime.now().isoformat(),
         "learning_objectives_met": objectives_met,
     }
+    if "weight" in existing:
+        updated["weight"] = existing["weight"]
+    return updated
+
+
+def update_mastery(
+    current_mastery: Dict[str, Any],
+    topic: str,
+    correctness_score: int,          # 0–10 from evaluator
+    all_topics_mastery: Dict[str, Any],
+) -> Tuple[Dict[str, Any], float]:
+    """
+    Updates the mastery data for a specific topic.
+    Returns the updated mastery dict for that topic and the global score.
+    """
+    updated = update_topic_mastery(current_mastery, correctness_score)
 
     # Compute global mastery: average of all topic scores
     all_updated = {**all_topics_mastery, topic: updated}
@@ -132,6 +144,93 @@ def update_mastery(
     return updated, global_score
 
 
+# ---------------------------------------------------------------------------
+# Incremental global score (running aggregates)
+# ---------------------------------------------------------------------------
+#
+# The global score is the weighted mean of topic scores. Instead of re-averaging
+# every topic on each evaluation, state carries the running aggregate
+#   {"sum": Σ weight·score, "weight": Σ weight, "count": number of topics}
+# and each update swaps one topic's old contribution for its new one.
+# A topic's weight defaults to 1.0 (plain average, as update_mastery computes).
+# `python -m ml.mastery` checks the running aggregate against a from-scratch
+# recompute over random updates.
+
+def _topic_score(mastery: Any) -> float:
+    return float(mastery.get("score", 0.0)) if isinstance(mastery, dict) else 0.0
+
+
+def _topic_weight(mastery: Any) -> float:
+    return float(mastery.get("weight", 1.0)) if isinstance(mastery, dict) else 1.0
+
+
+def global_score_from_aggregate(aggregate: Dict[str, float]) -> float:
+    weight = aggregate.get("weight", 0.0)
+    mean = aggregate.get("sum", 0.0) / weight if weight > 0 else 0.0
+    return float(int(mean * 10000 + 0.5) / 10000.0)
+
+
+def aggregate_from_levels(all_topics_mastery: Dict[str, Any]) -> Dict[str, float]:
+    """Recompute the running aggregate from scratch (O(topics))."""
+    levels = all_topics_mastery or {}
+    return {
+        "sum": sum(_topic_weight(v) * _topic_score(v) for v in levels.values()),
+        "weight": sum(_topic_weight(v) for v in levels.values()),
+        "count": len(levels),
+    }
+
+
+def update_mastery_incremental(
+    current_mastery: Optional[Dict[str, Any]],
+    correctness_score: int,
+    aggregate: Optional[Dict[str, float]],
+    weight: Optional[float] = None,
+) -> Tuple[Dict[str, Any], Dict[str, float], float]:
+    """
+    O(1) variant of update_mastery: current_mastery is the topic's existing
+    mastery dict (None for a topic not yet in mastery_levels) and aggregate the state's running
+    aggregate. Returns (updated topic mastery, new aggregate, global score).
+    weight overrides the topic's stored weight.
+    """
+    existing = current_mastery if isinstance(current_mastery, dict) else None
+    updated = update_topic_mastery(existing or {}, correctness_score)
+    new_weight = _topic_weight(existing)
+    if weight is not None:
+        new_weight = updated["weight"] = float(weight)
+
+    aggregate = aggregate or {"sum": 0.0, "weight": 0.0, "count": 0}
+    total = aggregate.get("sum", 0.0) + new_weight * updated["score"]
+    total_weight = aggregate.get("weight", 0.0) + new_weight
+    count = aggregate.get("count", 0)
+    if existing is None:
+        count += 1
+    else:
+        total -= _topic_weight(existing) * _topic_score(existing)
+        total_weight -= _topic_weight(existing)
+
+    new_aggregate = {"sum": total, "weight": total_weight, "count": count}
+    return updated, new_aggregate, global_score_from_aggregate(new_aggregate)
+
+
+def check_aggregate(
+    all_topics_mastery: Dict[str, Any],
+    aggregate: Dict[str, float],
+    tolerance: float = 1e-6,
+) -> List[str]:
+    """
+    Consistency check: recompute the aggregate from the topic documents and
+    list every field that drifted beyond tolerance (empty list = consistent).
+    """
+    expected = aggregate_from_levels(all_topics_mastery)
+    problems = []
+    for field in ("sum", "weight"):
+        if abs(expected[field] - aggregate.get(field, 0.0)) > tolerance:
+            problems.append(f"{field}: expected {expected[field]!r}, got {aggregate.get(field)!r}")
+    if expected["count"] != aggregate.get("count"):
+        problems.append(f"count: expected {expected['count']!r}, got {aggregate.get('count')!r}")
+    return problems
+
+
 def get_mastery_label(score: float) -> str:
     if score >= 0.80:
         return "Mastered 🏆"
@@ -143,3 +242,40 @@ def get_mastery_label(score: float) -> str:
         return "Beginner 🌱"
     else:
         return "Not Started"
+
+
+def _self_test(updates: int = 5000, seed: int = 0) -> int:
+    """
+    Random evaluations (new topics, re-evaluations, weight overrides) applied
+    through update_mastery_incremental; after every one the running aggregate
+    must match aggregate_from_levels. Returns the number of drifted updates.
+    """
+    import random
+
+    rng = random.Random(seed)
+    levels: Dict[str, Any] = {}
+    aggregate = aggregate_from_levels(levels)
+    failures = 0
+    for i in range(updates):
+        topic = f"topic-{rng.randrange(40)}"
+        weight = rng.choice((None, None, None, 0.5, 1.0, 2.0, 3.0))
+        levels[topic], aggregate, score = update_mastery_incremental(
+            levels.get(topic), rng.randint(0, 10), aggregate, weight=weight,
+        )
+        problems = check_aggregate(levels, aggregate)
+        expected = global_score_from_aggregate(aggregate_from_levels(levels))
+        if abs(score - expected) > 1.5e-4:  # one unit in the 4th decimal: summation order differs
+            problems.append(f"global score: expected {expected!r}, got {score!r}")
+        if problems:
+            failures += 1
+            print(f"update {i} ({topic}): {'; '.join(problems)}")
+    return failures
+
+
+if __name__ == "__main__":
+    # python -m ml.mastery — consistency check of the running aggregate
+    import sys
+
+    failed = _self_test()
+    print("running aggregate vs aggregate_from_levels:", "OK" if not failed else f"{failed} DRIFTED")
+    sys.exit(1 if failed else 0)
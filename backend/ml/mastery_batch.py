@@ -0,0 +1,148 @@
+"""
+Vectorized batch version of ml.mastery.update_mastery (NumPy).
+
+Rescoring a class or replaying a semester of evaluations is a stream of
+(student, topic, correctness_score) events. Each (student, topic) pair is an
+independent ELO + BKT series, so events are grouped by their position within
+their series and every step is applied to all series at once. Arithmetic and
+4-decimal rounding mirror the scalar functions operation for operation, so
+results are identical to calling update_mastery event by event.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ml.mastery import BKT_PG, BKT_PS, BKT_PT, ELO_K, aggregate_from_levels, global_score_from_aggregate
+
+
+class BatchMasteryResult(NamedTuple):
+    event_scores: np.ndarray        # blended mastery after each event (input order)
+    event_elo: np.ndarray
+    event_bkt: np.ndarray
+    event_status: np.ndarray        # "not_started" | "in_progress" | "mastered"
+    mastery: Dict[str, Dict[str, Dict[str, Any]]]   # student → topic → mastery dict
+    global_scores: Dict[str, float]                 # student → global mastery score
+
+
+def _round4(x: np.ndarray) -> np.ndarray:
+    # Same as float(int(x * 10000 + 0.5) / 10000.0) for x >= 0
+    return np.floor(x * 10000 + 0.5) / 10000.0
+
+
+def elo_update_batch(current: np.ndarray, passed: np.ndarray, k: float = ELO_K) -> np.ndarray:
+    new = np.where(passed, current + k * (1.0 - current), current - k * current)
+    return _round4(np.clip(new, 0.0, 1.0))
+
+
+def bkt_update_batch(pL: np.ndarray, correct: np.ndarray) -> np.ndarray:
+    p_obs_given_know = np.where(correct, 1 - BKT_PS, BKT_PS)
+    p_obs_given_not_know = np.where(correct, BKT_PG, 1 - BKT_PG)
+    numerator = p_obs_given_know * pL
+    denominator = numerator + p_obs_given_not_know * (1 - pL)
+    safe = np.where(denominator > 0, denominator, 1.0)
+    pL_given_obs = np.where(denominator > 0, numerator / safe, pL)
+    pL_new = pL_given_obs + (1 - pL_given_obs) * BKT_PT
+    return _round4(np.minimum(1.0, pL_new))
+
+
+def status_for(scores: np.ndarray) -> np.ndarray:
+    return np.where(scores >= 0.80, "mastered", np.where(scores > 0.3, "in_progress", "not_started"))
+
+
+def update_mastery_batch(
+    student_ids: Sequence[str],
+    topics: Sequence[str],
+    correctness_scores: Sequence[int],
+    initial_mastery: Optional[Dict[str, Dict[str, Dict[str, Any]]]] = None,
+    timestamps: Optional[Sequence[str]] = None,
+) -> BatchMasteryResult:
+    """
+    Apply events in order. initial_mastery is student → topic → mastery dict
+    (the shape of AgentState.mastery_levels per student); missing series start
+    at the scalar defaults (score 0.3, bkt 0.3, 0 attempts).
+    """
+    initial_mastery = initial_mastery or {}
+    n = len(student_ids)
+    correctness = np.asarray(correctness_scores, dtype=np.int64)
+    passed = correctness >= 6
+
+    # --- Map events to series ids, in order of first appearance ---
+    series_index: Dict[Tuple[str, str], int] = {}
+    event_series = np.fromiter(
+        (series_index.setdefault(key, len(series_index)) for key in zip(student_ids, topics)),
+        dtype=np.int64, count=n,
+    )
+    series_keys = list(series_index)
+
+    n_series = len(series_keys)
+    score = np.full(n_series, 0.3)
+    bkt = np.full(n_series, 0.3)
+    attempts = np.zeros(n_series, dtype=np.int64)
+    for sid, (student, topic) in enumerate(series_keys):
+        existing = (initial_mastery.get(student) or {}).get(topic)
+        if isinstance(existing, dict):
+            score[sid] = float(existing.get("score", 0.3))
+            bkt[sid] = float(existing.get("bkt_score", 0.3))
+            attempts[sid] = int(existing.get("attempts", 0))
+
+    # --- Position of each event within its series ---
+    order = np.argsort(event_series, kind="stable")
+    sorted_series = event_series[order]
+    starts = np.flatnonzero(np.r_[True, sorted_series[1:] != sorted_series[:-1]]) if n else np.array([], dtype=np.int64)
+    run_lengths = np.diff(np.r_[starts, n])
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(n) - np.repeat(starts, run_lengths)
+
+    # --- One vectorized step per rank: all series advance together ---
+    event_scores = np.empty(n)
+    event_elo = np.empty(n)
+    event_bkt = np.empty(n)
+    by_rank = np.argsort(rank, kind="stable")
+    rank_bounds = np.r_[0, np.cumsum(np.bincount(rank))] if n else np.array([0])
+    for step in range(len(rank_bounds) - 1):
+        idx = by_rank[rank_bounds[step]:rank_bounds[step + 1]]
+        sids = event_series[idx]
+        new_elo = elo_update_batch(score[sids], passed[idx])
+        new_bkt = bkt_update_batch(bkt[sids], passed[idx])
+        blended = _round4(0.6 * new_elo + 0.4 * new_bkt)
+        score[sids] = blended
+        bkt[sids] = new_bkt
+        event_scores[idx] = blended
+        event_elo[idx] = new_elo
+        event_bkt[idx] = new_bkt
+
+    attempts += np.bincount(event_series, minlength=n_series)
+    event_status = status_for(event_scores)
+
+    # --- Final per-series documents and per-student global scores ---
+    last_event = np.empty(n_series, dtype=np.int64)
+    last_event[event_series] = np.arange(n)  # later events overwrite earlier ones
+    now = datetime.now().isoformat()
+    mastery: Dict[str, Dict[str, Dict[str, Any]]] = {
+        student: dict(topics_mastery) for student, topics_mastery in initial_mastery.items()
+    }
+    for sid, (student, topic) in enumerate(series_keys):
+        i = last_event[sid]
+        existing = (initial_mastery.get(student) or {}).get(topic) or {}
+        topic_mastery = mastery.setdefault(student, {})[topic] = {
+            "score": float(score[sid]),
+            "elo_score": float(event_elo[i]),
+            "bkt_score": float(bkt[sid]),
+            "attempts": int(attempts[sid]),
+            "last_correctness": int(correctness[i]),
+            "status": str(event_status[i]),
+            "last_updated": timestamps[i] if timestamps is not None else now,
+            "learning_objectives_met": existing.get("learning_objectives_met", []),
+        }
+        if "weight" in existing:
+            topic_mastery["weight"] = existing["weight"]
+
+    # Weighted mean, as the live incremental path computes it
+    global_scores = {
+        student: global_score_from_aggregate(aggregate_from_levels(mastery[student]))
+        for student in {s for s, _ in series_keys}
+    }
+
+    return BatchMasteryResult(event_scores, event_elo, event_bkt, event_status, mastery, global_scores)
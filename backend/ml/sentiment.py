@@ -2,10 +2,16 @@
 Lexical + weighted sentiment analysis.
 Computes frustration_level (0-1), sentiment label, and engagement_score (0-1).
 No external ML library needed — pure Python, fast.
+
+All three lexicons are compiled once into a word-level Aho-Corasick automaton,
+so a message is scored in a single pass over its words. Matching respects
+word boundaries ("hard" does not fire inside "hardware"), and a phrase that
+sits inside a longer matched phrase is ignored ("i know" inside "i know nothing").
 """
 
 import re
-from typing import Dict, Tuple
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
 
 # ---------------------------------------------------------------------------
 # Lexicons — (pattern, frustration_weight, engagement_delta)
@@ -79,12 +85,96 @@ CONFUSION_LEXICON: Dict[str, float] = {
     "maybe": 0.05,
 }
 
+# Phrases that score nothing themselves; they only keep the shorter phrases
+# nested in them from firing ("i know" is not positive in "i know nothing")
+NEUTRAL_PHRASES: List[str] = [
+    "i know nothing",
+]
+
+
+# ---------------------------------------------------------------------------
+# Word-level Aho-Corasick automaton over all lexicons
+# ---------------------------------------------------------------------------
+
+_WORD_RE = re.compile(r"[\w']+")
+
+FRUSTRATION, POSITIVE, CONFUSION, NEUTRAL = 0, 1, 2, 3
+
 
-def _normalize(text: str) -> str:
-    text = text.lower()
-    text = re.sub(r"[^\w\s']", " ", text)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+class _PhraseAutomaton:
+    """
+    Aho-Corasick over word sequences. Each state keeps the (category, weight,
+    phrase_length) outputs reachable through its failure chain, so one scan of
+    the words yields every lexicon match with its span.
+    """
+
+    def __init__(self, lexicons: List[Dict[str, float]]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[Tuple[int, float, int]]] = [[]]
+        self.vocab = set()
+
+        for category, lexicon in enumerate(lexicons):
+            for phrase, weight in lexicon.items():
+                words = _WORD_RE.findall(phrase.lower())
+                self.vocab.update(words)
+                state = 0
+                for word in words:
+                    nxt = self.goto[state].get(word)
+                    if nxt is None:
+                        nxt = len(self.goto)
+                        self.goto[state][word] = nxt
+                        self.goto.append({})
+                        self.fail.append(0)
+                        self.out.append([])
+                    state = nxt
+                self.out[state].append((category, weight, len(words)))
+
+        # Breadth-first failure links; outputs inherit from their failure state
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and word not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(word, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def scores(self, words: List[str]) -> Tuple[float, float, float]:
+        """Max weight per category, ignoring matches nested inside a longer match."""
+        goto, fail, out, vocab = self.goto, self.fail, self.out, self.vocab
+        matches = []  # (start, end, category, weight)
+        state = 0
+        for end, word in enumerate(words, start=1):
+            if word not in vocab:
+                state = 0  # no phrase contains this word: every path resets to the root
+                continue
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            for category, weight, length in out[state]:
+                matches.append((end - length, end, category, weight))
+
+        best = [0.0, 0.0, 0.0, 0.0]  # NEUTRAL phrases only shadow nested matches
+        if len(matches) == 1:
+            _, _, category, weight = matches[0]
+            best[category] = weight
+            return best[FRUSTRATION], best[POSITIVE], best[CONFUSION]
+        for start, end, category, weight in matches:
+            nested = any(
+                s <= start and end <= e and (e - s) > (end - start)
+                for s, e, _, _ in matches
+            )
+            if not nested and weight > best[category]:
+                best[category] = weight
+        return best[FRUSTRATION], best[POSITIVE], best[CONFUSION]
+
+
+_AUTOMATON = _PhraseAutomaton([
+    FRUSTRATION_LEXICON, POSITIVE_LEXICON, CONFUSION_LEXICON, dict.fromkeys(NEUTRAL_PHRASES, 0.0),
+])
 
 
 def analyze_sentiment(text: str) -> Tuple[float, str, float]:
@@ -94,26 +184,7 @@ def analyze_sentiment(text: str) -> Tuple[float, str, float]:
     - sentiment: 'positive' | 'neutral' | 'confused' | 'negative'
     - engagement_score: 0.0 (disengaged) → 1.0 (highly engaged)
     """
-    normalized = _normalize(text)
-
-    frustration_score = 0.0
-    positive_score = 0.0
-    confusion_score = 0.0
-
-    # Score frustration phrases
-    for phrase, weight in FRUSTRATION_LEXICON.items():
-        if phrase in normalized:
-            frustration_score = max(frustration_score, weight)
-
-    # Score positive phrases
-    for phrase, weight in POSITIVE_LEXICON.items():
-        if phrase in normalized:
-            positive_score = max(positive_score, weight)
-
-    # Score confusion phrases
-    for phrase, weight in CONFUSION_LEXICON.items():
-        if phrase in normalized:
-            confusion_score = max(confusion_score, weight)
+    frustration_score, positive_score, confusion_score = _AUTOMATON.scores(_WORD_RE.findall(text.lower()))
 
     # Compute net frustration (positive phrases reduce frustration)
     net_frustration = max(0.0, min(1.0, frustration_score - positive_score * 0.5))
@@ -140,6 +211,17 @@ def analyze_sentiment(text: str) -> Tuple[float, str, float]:
     )
 
 
+def analyze_sentiment_batch(texts: Iterable[str]) -> List[Tuple[float, str, float]]:
+    """
+    analyze_sentiment over many messages (e.g. a classroom burst or a replay).
+    Each distinct message is scanned once and its result reused for every
+    repeat — bursts are dominated by short repeated replies ("got it", "thanks").
+    """
+    texts = list(texts)
+    scored = {text: analyze_sentiment(text) for text in dict.fromkeys(texts)}
+    return [scored[text] for text in texts]
+
+
 def update_frustration_with_decay(
     current_level: float, new_signal: float, decay: float = 0.15
 ) -> float:
@@ -8,6 +8,8 @@ Flow per student turn:
     ↓ (routes by state["next_agent"])
   [tutor | planner | evaluator | coach]   ← Each writes state updates back
     ↓
+  [compact_node]        ← Folds old messages into conversation_summary past a size threshold
+    ↓
   END
 
 This makes the system truly agentic:
@@ -17,10 +19,13 @@ This makes the system truly agentic:
 - Frustration decays after coaching
 """
 
+import functools
+import threading
 from datetime import datetime
 from typing import Literal
 
-from langchain_core.messages import AIMessage
+from langchain_core.messages import AIMessage, RemoveMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langgraph.graph import StateGraph, END
 
 from state import AgentState
@@ -29,7 +34,19 @@ from agents.tutor import tutor_agent
 from agents.planner import planner_agent
 from agents.evaluator import evaluator_agent
 from agents.coach import coach_agent
-from ml.mastery import update_mastery
+from agents.summarizer import summarizer
+from agents.prompts import prompt_stats
+from agents.rate_limit import with_llm_priority
+from metrics import ROUTES, timed_node
+from ml.mastery import aggregate_from_levels, update_mastery_incremental
+from speculation import speculator
+
+SPECIALIST_AGENTS = {
+    "tutor": tutor_agent,
+    "planner": planner_agent,
+    "evaluator": evaluator_agent,
+    "coach": coach_agent,
+}
 
 
 # ---------------------------------------------------------------------------
@@ -41,7 +58,31 @@ def meta_agent_node(state: AgentState) -> dict:
     The brain of the system. Analyzes the message using ML + LLM,
     then writes routing decision and emotional state to shared state.
     """
-    state_updates = meta_agent.analyze(state)
+    return _log_routing(meta_agent.analyze(state))
+
+
+async def ameta_agent_node(state: AgentState, config: RunnableConfig) -> dict:
+    if speculator.enabled and not meta_agent.routes_without_llm(state):
+        # Overlap the likely specialist with the routing LLM call
+        agent_name = speculator.predict(state)
+        call = SPECIALIST_AGENTS[agent_name].agenerate_response
+        if agent_name == "tutor":
+            # The speculative answer replaces the tutor's own call, so it honours bypass_cache too;
+            # it never writes the cache: its key would carry the pre-routing topic
+            call = functools.partial(call, use_cache=_use_cache(config), cache_writes=False)
+        # Typical prompt size is enough to account for a wasted speculation
+        prompt_chars = prompt_stats.average_chars(agent_name)
+        speculator.launch(state, agent_name, call, prompt_chars)
+        try:
+            return _log_routing(await meta_agent.aanalyze(state))
+        except BaseException:
+            speculator.discard(state)  # no specialist will claim it (routing failed or was cancelled)
+            raise
+    return _log_routing(await meta_agent.aanalyze(state))
+
+
+def _log_routing(state_updates: dict) -> dict:
+    ROUTES.labels(state_updates.get("next_agent", "tutor")).inc()
     print(f"[MetaAgent] → next: {state_updates.get('next_agent')} | "
           f"frustration: {state_updates.get('frustration_level', 0):.2f} | "
           f"sentiment: {state_updates.get('sentiment')}")
@@ -52,8 +93,22 @@ def meta_agent_node(state: AgentState) -> dict:
 # Node 1: Tutor
 # ---------------------------------------------------------------------------
 
-def tutor_node(state: AgentState) -> dict:
-    response_text = tutor_agent.generate_response(state)
+def tutor_node(state: AgentState, config: RunnableConfig) -> dict:
+    return _tutor_updates(tutor_agent.generate_response(state, use_cache=_use_cache(config)))
+
+
+async def atutor_node(state: AgentState, config: RunnableConfig) -> dict:
+    response_text = await speculator.claim(state, "tutor")
+    if response_text is None:
+        response_text = await tutor_agent.agenerate_response(state, use_cache=_use_cache(config))
+    return _tutor_updates(response_text)
+
+
+def _use_cache(config: RunnableConfig) -> bool:
+    return not (config or {}).get("configurable", {}).get("bypass_cache", False)
+
+
+def _tutor_updates(response_text: str) -> dict:
     return {
         "messages": [AIMessage(content=response_text)],
         "last_agent": "tutor",
@@ -65,7 +120,17 @@ def tutor_node(state: AgentState) -> dict:
 # ---------------------------------------------------------------------------
 
 def planner_node(state: AgentState) -> dict:
-    response_text, new_objectives = planner_agent.generate_response(state)
+    return _planner_updates(*planner_agent.generate_response(state))
+
+
+async def aplanner_node(state: AgentState) -> dict:
+    result = await speculator.claim(state, "planner")
+    if result is None:
+        result = await planner_agent.agenerate_response(state)
+    return _planner_updates(*result)
+
+
+def _planner_updates(response_text: str, new_objectives: list) -> dict:
     updates = {
         "messages": [AIMessage(content=response_text)],
         "last_agent": "planner",
@@ -80,23 +145,30 @@ def planner_node(state: AgentState) -> dict:
 # ---------------------------------------------------------------------------
 
 def evaluator_node(state: AgentState) -> dict:
-    response_text, evaluation_result = evaluator_agent.generate_response(state)
+    return _evaluator_updates(state, *evaluator_agent.generate_response(state))
+
+
+async def aevaluator_node(state: AgentState) -> dict:
+    result = await speculator.claim(state, "evaluator")
+    if result is None:
+        result = await evaluator_agent.agenerate_response(state)
+    return _evaluator_updates(state, *result)
+
+
+def _evaluator_updates(state: AgentState, response_text: str, evaluation_result: dict) -> dict:
 
-    # --- Update mastery using ELO + BKT algorithm ---
+    # --- Update mastery using ELO + BKT algorithm (O(1) via running aggregate) ---
     topic = state.get("current_topic", "General")
     correctness_score = evaluation_result.get("score", 5)
     current_mastery_levels = state.get("mastery_levels", {}) or {}
-    current_topic_mastery = current_mastery_levels.get(topic, {}) or {}
+    aggregate = state.get("mastery_aggregate") or aggregate_from_levels(current_mastery_levels)
 
-    updated_topic_mastery, new_global_score = update_mastery(
-        current_mastery=current_topic_mastery,
-        topic=topic,
+    updated_topic_mastery, new_aggregate, new_global_score = update_mastery_incremental(
+        current_mastery=current_mastery_levels.get(topic),
         correctness_score=correctness_score,
-        all_topics_mastery=current_mastery_levels,
+        aggregate=aggregate,
     )
 
-    new_mastery_levels = {**current_mastery_levels, topic: updated_topic_mastery}
-
     print(f"[Evaluator] Topic: {topic} | Score: {correctness_score}/10 | "
           f"Mastery: {updated_topic_mastery['score']:.1%} | Global: {new_global_score:.1%}")
 
@@ -104,7 +176,8 @@ def evaluator_node(state: AgentState) -> dict:
         "messages": [AIMessage(content=response_text)],
         "last_agent": "evaluator",
         "last_evaluation_result": evaluation_result,
-        "mastery_levels": new_mastery_levels,
+        "mastery_levels": {topic: updated_topic_mastery},  # merged by the state reducer
+        "mastery_aggregate": new_aggregate,
         "global_mastery_score": new_global_score,
     }
 
@@ -114,7 +187,17 @@ def evaluator_node(state: AgentState) -> dict:
 # ---------------------------------------------------------------------------
 
 def coach_node(state: AgentState) -> dict:
-    response_text = coach_agent.generate_response(state)
+    return _coach_updates(state, coach_agent.generate_response(state))
+
+
+async def acoach_node(state: AgentState) -> dict:
+    response_text = await speculator.claim(state, "coach")
+    if response_text is None:
+        response_text = await coach_agent.agenerate_response(state)
+    return _coach_updates(state, response_text)
+
+
+def _coach_updates(state: AgentState, response_text: str) -> dict:
 
     # After coaching, reduce frustration significantly
     current_frustration = state.get("frustration_level", 0.0)
@@ -131,6 +214,37 @@ def coach_node(state: AgentState) -> dict:
     }
 
 
+# ---------------------------------------------------------------------------
+# Node 5: Compaction (bounds the raw message history)
+# ---------------------------------------------------------------------------
+
+def compact_node(state: AgentState) -> dict:
+    folded, _ = summarizer.split(state)
+    if not folded:
+        return {}
+    summary = summarizer.summarize(state.get("conversation_summary", ""), folded)
+    return _compact_updates(state, folded, summary)
+
+
+async def acompact_node(state: AgentState) -> dict:
+    folded, _ = summarizer.split(state)
+    if not folded:
+        return {}
+    summary = await summarizer.asummarize(state.get("conversation_summary", ""), folded)
+    return _compact_updates(state, folded, summary)
+
+
+def _compact_updates(state: AgentState, folded: list, summary: str) -> dict:
+    summarized_count = int(state.get("summarized_count", 0) or 0) + len(folded)
+    print(f"[Compact] Folded {len(folded)} messages into the summary "
+          f"({summarized_count} summarized, {len(state['messages']) - len(folded)} kept)")
+    return {
+        "messages": [RemoveMessage(id=m.id) for m in folded],
+        "conversation_summary": summary,
+        "summarized_count": summarized_count,
+    }
+
+
 # ---------------------------------------------------------------------------
 # Router: reads next_agent from state (set by MetaAgent)
 # ---------------------------------------------------------------------------
@@ -148,34 +262,69 @@ def router(state: AgentState) -> Literal["tutor", "planner", "evaluator", "coach
 # Build the LangGraph
 # ---------------------------------------------------------------------------
 
-workflow = StateGraph(AgentState)
-
-# Add all nodes
-workflow.add_node("meta_agent", meta_agent_node)
-workflow.add_node("tutor", tutor_node)
-workflow.add_node("planner", planner_node)
-workflow.add_node("evaluator", evaluator_node)
-workflow.add_node("coach", coach_node)
-
-# Entry point: always start with MetaAgent
-workflow.set_entry_point("meta_agent")
-
-# MetaAgent → conditional routing to specialized agents
-workflow.add_conditional_edges(
-    "meta_agent",
-    router,
-    {
-        "tutor": "tutor",
-        "planner": "planner",
-        "evaluator": "evaluator",
-        "coach": "coach",
-    },
-)
-
-# All agents → END after responding
-workflow.add_edge("tutor", END)
-workflow.add_edge("planner", END)
-workflow.add_edge("evaluator", END)
-workflow.add_edge("coach", END)
-
-app = workflow.compile()
+def build_graph():
+    workflow = StateGraph(AgentState)
+
+    # Add all nodes — each has a native async variant, so app.ainvoke never
+    # parks an LLM call on the thread pool (app.invoke still uses the sync path).
+    # Both variants are timed into copilot_node_latency_seconds; specialists'
+    # LLM calls are scheduled at the priority_level the MetaAgent assigned.
+    for name, node, anode in (
+        ("meta_agent", meta_agent_node, ameta_agent_node),
+        ("compact", compact_node, acompact_node),
+    ):
+        workflow.add_node(name, RunnableLambda(timed_node(name, node), afunc=timed_node(name, anode)))
+    for name, node, anode in (
+        ("tutor", tutor_node, atutor_node),
+        ("planner", planner_node, aplanner_node),
+        ("evaluator", evaluator_node, aevaluator_node),
+        ("coach", coach_node, acoach_node),
+    ):
+        workflow.add_node(name, RunnableLambda(
+            timed_node(name, with_llm_priority(node)), afunc=timed_node(name, with_llm_priority(anode)),
+        ))
+
+    # Entry point: always start with MetaAgent
+    workflow.set_entry_point("meta_agent")
+
+    # MetaAgent → conditional routing to specialized agents
+    workflow.add_conditional_edges(
+        "meta_agent",
+        router,
+        {
+            "tutor": "tutor",
+            "planner": "planner",
+            "evaluator": "evaluator",
+            "coach": "coach",
+        },
+    )
+
+    # All agents → compaction → END after responding
+    workflow.add_edge("tutor", "compact")
+    workflow.add_edge("planner", "compact")
+    workflow.add_edge("evaluator", "compact")
+    workflow.add_edge("coach", "compact")
+    workflow.add_edge("compact", END)
+
+    return workflow.compile()
+
+
+_app = None
+_app_lock = threading.Lock()
+
+
+def get_app():
+    """The compiled graph, built on first use (or at app startup) rather than at import."""
+    global _app
+    if _app is None:
+        with _app_lock:
+            if _app is None:
+                _app = build_graph()
+    return _app
+
+
+def __getattr__(name: str):
+    # Backwards compatibility: `from orchestrator import app`
+    if name == "app":
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,237 @@
+"""
+Offline mastery replay / backfill.
+
+Rebuilds every students/{id}/mastery/{topic} document (and the topics in each
+students/{id}/summary/mastery document) from a JSONL export of
+historical evaluations, e.g. after changing the ELO k-factor or BKT parameters
+in ml/mastery.py. One event per line, in chronological order:
+
+    {"student_id": "s1", "topic": "DSA", "score": 7, "timestamp": "2025-03-01T10:00:00"}
+
+("correctness_score" is accepted for "score"; "timestamp" is optional.)
+
+    python replay_mastery.py evaluations.jsonl --dry-run      # diff against Firestore, write nothing
+    python replay_mastery.py evaluations.jsonl --workers 8    # replay and write back
+
+Events are partitioned into shards by crc32(student_id), so each student's
+events stay in order within one shard. Shards are replayed on a process pool
+with the batch engine (ml/mastery_batch.py) and written back in WriteBatches.
+Progress is checkpointed per shard in <work-dir>/checkpoint.json; rerunning
+the same command resumes after the last written shard (--restart starts over).
+Existing learning_objectives_met fields are kept (documents are merged).
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Dict, List, Tuple
+
+# Fields compared in --dry-run diffs
+DIFF_FIELDS = ("score", "attempts", "status")
+
+
+def shard_of(student_id: str, shards: int) -> int:
+    return zlib.crc32(student_id.encode("utf-8")) % shards
+
+
+def _shard_path(work_dir: str, shard: int) -> str:
+    return os.path.join(work_dir, f"shard-{shard:04d}.jsonl")
+
+
+# ---------------------------------------------------------------------------
+# Checkpoint
+# ---------------------------------------------------------------------------
+
+def _load_checkpoint(work_dir: str) -> dict:
+    try:
+        with open(os.path.join(work_dir, "checkpoint.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_checkpoint(work_dir: str, checkpoint: dict):
+    path = os.path.join(work_dir, "checkpoint.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(path + ".tmp", path)  # atomic: a crash never leaves a torn checkpoint
+
+
+def _input_fingerprint(path: str) -> dict:
+    stat = os.stat(path)
+    return {"input": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+# ---------------------------------------------------------------------------
+# Partition (streaming — the export never has to fit in memory)
+# ---------------------------------------------------------------------------
+
+def partition(input_path: str, work_dir: str, shards: int) -> Tuple[int, int]:
+    """Split the export into per-shard files of [student_id, topic, score, timestamp]; returns (events, skipped)."""
+    files = [open(_shard_path(work_dir, s), "w") for s in range(shards)]
+    events = skipped = 0
+    try:
+        with open(input_path) as f:
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    event = json.loads(line)
+                    student_id = str(event["student_id"])
+                    topic = str(event["topic"])
+                    score = int(event["score"] if "score" in event else event["correctness_score"])
+                except (ValueError, KeyError, TypeError) as e:
+                    skipped += 1
+                    print(f"[Replay] line {line_no}: skipped ({type(e).__name__}: {e})")
+                    continue
+                row = [student_id, topic, score, event.get("timestamp")]
+                files[shard_of(student_id, shards)].write(json.dumps(row) + "\n")
+                events += 1
+    finally:
+        for fh in files:
+            fh.close()
+    return events, skipped
+
+
+# ---------------------------------------------------------------------------
+# Replay (runs in worker processes)
+# ---------------------------------------------------------------------------
+
+def replay_shard(path: str) -> Tuple[int, Dict[str, Dict[str, dict]]]:
+    """Replay one shard file; returns (events, student → topic → mastery document)."""
+    from ml.mastery_batch import update_mastery_batch
+
+    student_ids: List[str] = []
+    topics: List[str] = []
+    scores: List[int] = []
+    timestamps: List[str] = []
+    now = time.strftime("%Y-%m-%dT%H:%M:%S")
+    with open(path) as f:
+        for line in f:
+            student_id, topic, score, timestamp = json.loads(line)
+            student_ids.append(student_id)
+            topics.append(topic)
+            scores.append(score)
+            timestamps.append(timestamp or now)
+
+    if not student_ids:
+        return 0, {}
+    result = update_mastery_batch(student_ids, topics, scores, timestamps=timestamps)
+    for topics_mastery in result.mastery.values():
+        for doc in topics_mastery.values():
+            doc.pop("learning_objectives_met", None)  # merge keeps whatever is stored
+    return len(student_ids), result.mastery
+
+
+# ---------------------------------------------------------------------------
+# Dry-run diff
+# ---------------------------------------------------------------------------
+
+def diff_shard(db, rebuilt: Dict[str, Dict[str, dict]], limit: int, read_workers: int) -> Dict[str, int]:
+    """Print per-topic differences against the stored documents; returns counts."""
+    counts = {"new": 0, "changed": 0, "unchanged": 0}
+    with ThreadPoolExecutor(max_workers=read_workers) as pool:
+        results = pool.map(lambda student_id: db.get_mastery(student_id, materialize=False), rebuilt)
+        stored_by_student = dict(zip(rebuilt, results))
+    for student_id, topics in rebuilt.items():
+        stored = stored_by_student[student_id]
+        for topic, doc in topics.items():
+            old = stored.get(topic)
+            if old is None:
+                kind, detail = "new", f"score {doc['score']:.4f} ({doc['attempts']} attempts)"
+            else:
+                changed = [f for f in DIFF_FIELDS if old.get(f) != doc[f]]
+                if not changed:
+                    counts["unchanged"] += 1
+                    continue
+                kind = "changed"
+                detail = ", ".join(f"{f} {old.get(f)!r} → {doc[f]!r}" for f in changed)
+            counts[kind] += 1
+            if limit < 0 or counts["new"] + counts["changed"] <= limit:
+                print(f"  {kind:7s} {student_id}/{topic}: {detail}")
+    return counts
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL export of evaluation events")
+    parser.add_argument("--shards", type=int, default=64, help="partitions by crc32(student_id)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="replay processes")
+    parser.add_argument("--work-dir", help="shard files and checkpoint (default: <input>.replay/)")
+    parser.add_argument("--dry-run", action="store_true", help="print a diff against Firestore; write nothing")
+    parser.add_argument("--diff-limit", type=int, default=50, help="max diff lines per shard (-1: all)")
+    parser.add_argument("--read-workers", type=int, default=16, help="concurrent Firestore reads in --dry-run")
+    parser.add_argument("--restart", action="store_true", help="discard the checkpoint and start over")
+    args = parser.parse_args()
+
+    from database import get_db
+
+    db = get_db()
+    if not db._is_available() and not args.dry_run:
+        sys.exit("[Replay] Firestore is not available; refusing to run without --dry-run")
+
+    work_dir = args.work_dir or args.input + ".replay"
+    if args.restart and os.path.isdir(work_dir):
+        shutil.rmtree(work_dir)
+    os.makedirs(work_dir, exist_ok=True)
+
+    fingerprint = {**_input_fingerprint(args.input), "shards": args.shards}
+    checkpoint = _load_checkpoint(work_dir)
+    if checkpoint.get("fingerprint") != fingerprint:
+        if checkpoint:
+            print("[Replay] Input or shard count changed since the last run; starting over.")
+        start = time.perf_counter()
+        events, skipped = partition(args.input, work_dir, args.shards)
+        checkpoint = {"fingerprint": fingerprint, "events": events, "skipped": skipped, "done": [], "written": 0}
+        _save_checkpoint(work_dir, checkpoint)
+        print(f"[Replay] Partitioned {events:,} events into {args.shards} shards "
+              f"in {time.perf_counter() - start:.1f}s ({skipped} lines skipped)")
+    elif checkpoint["done"]:
+        print(f"[Replay] Resuming: {len(checkpoint['done'])}/{args.shards} shards already written")
+
+    done = set(checkpoint["done"])
+    pending = [s for s in range(args.shards) if args.dry_run or s not in done]
+    totals = {"new": 0, "changed": 0, "unchanged": 0}
+    replayed = 0
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(replay_shard, _shard_path(work_dir, s)): s for s in pending}
+        for finished, future in enumerate(as_completed(futures), start=1):
+            shard = futures[future]
+            events, rebuilt = future.result()
+            replayed += events
+            docs = sum(len(topics) for topics in rebuilt.values())
+
+            if args.dry_run:
+                print(f"[Replay] shard {shard}: {len(rebuilt):,} students, {docs:,} documents")
+                for kind, n in diff_shard(db, rebuilt, args.diff_limit, args.read_workers).items():
+                    totals[kind] += n
+            else:
+                written = db.bulk_update_mastery(rebuilt)
+                checkpoint["done"].append(shard)
+                checkpoint["written"] += written
+                _save_checkpoint(work_dir, checkpoint)
+
+            elapsed = time.perf_counter() - start
+            print(f"[Replay] {finished}/{len(pending)} shards | {replayed:,} events | "
+                  f"{replayed / elapsed:,.0f} events/s | {docs:,} documents from shard {shard}")
+
+    if args.dry_run:
+        print(f"[Replay] Dry run: {totals['new']:,} new, {totals['changed']:,} changed, "
+              f"{totals['unchanged']:,} unchanged documents (nothing written)")
+    else:
+        print(f"[Replay] Done: {checkpoint['written']:,} documents written; shard files in {work_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Speculative specialist execution (opt-in: SPECULATIVE_ROUTING=1).
+
+While the MetaAgent's routing LLM call is in flight, the most likely
+specialist — predicted from the local sentiment signal and the previous
+last_agent — starts generating on the pre-routing state. If routing confirms
+the prediction the specialist node uses that result (its prompt saw the
+pre-routing sentiment/topic, which is the accepted trade-off);
+otherwise the speculative call is cancelled and the routed agent runs as usual.
+A speculative call is scheduled at the predicted agent's priority_level, as
+if it had been routed — a predicted coach intervention does not wait behind
+the tutor backlog. A finished speculation nobody claims within
+SPECULATION_TTL_SECONDS is dropped and counted as a miss.
+Hit/miss counters and an estimate of the tokens wasted on misses are kept so
+the prediction policy can be tuned.
+"""
+
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from agents.meta_agent import AGENT_PRIORITY
+from agents.rate_limit import DEFAULT_PRIORITY, llm_priority
+from ml.sentiment import analyze_sentiment
+
+SPECIALISTS = ("tutor", "planner", "evaluator", "coach")
+
+
+def _estimate_tokens(chars: int) -> int:
+    return chars // 4  # ~4 characters per token for English text
+
+
+class Speculator:
+    def __init__(self, enabled: bool = False, ttl_seconds: float = 30.0):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self._inflight: Dict[Tuple[str, str], Tuple[str, asyncio.Task, int]] = {}
+        self.launched = 0
+        self.hits = 0
+        self.misses = 0
+        self.wasted_tokens = 0
+
+    def predict(self, state: dict) -> str:
+        """Cheap guess at MetaAgent's routing decision."""
+        messages = state.get("messages", [])
+        last_text = str(getattr(messages[-1], "content", "")) if messages else ""
+        ml_frustration, ml_sentiment, _ = analyze_sentiment(last_text)
+        if ml_frustration > 0.6 or ml_sentiment == "negative":
+            return "coach"
+        last_agent = state.get("last_agent")
+        if last_agent in ("tutor", "planner", "evaluator"):
+            return last_agent
+        return "tutor"
+
+    def launch(self, state: dict, agent: str, call: Callable[[dict], Awaitable[Any]], prompt_chars: int):
+        key = (state.get("student_id", ""), state.get("session_id", ""))
+        self._discard(key)  # a stale speculation from an earlier failed turn
+        # The task copies the current context, so its LLM calls keep this priority
+        token = llm_priority.set(AGENT_PRIORITY.get(agent, DEFAULT_PRIORITY))
+        try:
+            task = asyncio.create_task(call(state))
+        finally:
+            llm_priority.reset(token)
+        self._inflight[key] = (agent, task, prompt_chars)
+        self.launched += 1
+        task.add_done_callback(lambda t: asyncio.get_running_loop().call_later(self.ttl_seconds, self._expire, key, t))
+
+    def _expire(self, key: Tuple[str, str], task: asyncio.Task):
+        entry = self._inflight.get(key)
+        if entry is not None and entry[1] is task:
+            print(f"[Speculation] {entry[0]} result for {key} never claimed, dropped")
+            self._discard(key)
+
+    async def claim(self, state: dict, agent: str) -> Optional[Any]:
+        """
+        Called by a specialist node. Returns the speculative result if it was for
+        this agent, else None (after cancelling the speculation).
+        """
+        key = (state.get("student_id", ""), state.get("session_id", ""))
+        entry = self._inflight.pop(key, None)
+        if entry is None:
+            return None
+        spec_agent, task, prompt_chars = entry
+        if spec_agent == agent:
+            try:
+                result = await task
+            except Exception as e:
+                print(f"[Speculation] {agent} failed, running it again: {e}")
+                self.misses += 1
+                return None
+            self.hits += 1
+            return result
+        self._waste(task, prompt_chars)
+        return None
+
+    def discard(self, state: dict):
+        """Drop this session's unclaimed speculation (the turn ended before a specialist ran)."""
+        self._discard((state.get("student_id", ""), state.get("session_id", "")))
+
+    def _discard(self, key: Tuple[str, str]):
+        entry = self._inflight.pop(key, None)
+        if entry is not None:
+            self._waste(entry[1], entry[2])
+
+    def _waste(self, task: asyncio.Task, prompt_chars: int):
+        self.misses += 1
+        output_chars = 0
+        if task.done() and not task.cancelled() and task.exception() is None:
+            result = task.result()
+            output_chars = len(result[0] if isinstance(result, tuple) else str(result))
+        else:
+            task.cancel()
+        self.wasted_tokens += _estimate_tokens(prompt_chars + output_chars)
+
+    def stats(self) -> dict:
+        resolved = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "launched": self.launched,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / resolved, 4) if resolved else 0.0,
+            "wasted_tokens_estimate": self.wasted_tokens,
+        }
+
+
+speculator = Speculator(
+    enabled=os.getenv("SPECULATIVE_ROUTING", "0") == "1",
+    ttl_seconds=float(os.getenv("SPECULATION_TTL_SECONDS", "30")),
+)
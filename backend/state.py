@@ -9,9 +9,24 @@ class MasteryData(BaseModel):
     status: Literal["not_started", "in_progress", "mastered"] = "not_started"
     learning_objectives_met: List[str] = Field(default_factory=list)
 
+def merge_mastery_levels(left: Optional[Dict[str, Any]], right: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Reducer: nodes return only the topics they changed.
+
+    The graph input lands on an empty channel and is copied there, so after that
+    `left` is owned by this run and is updated in place (O(changed topics)).
+    """
+    if not left:
+        return dict(right or {})
+    if right:
+        left.update(right)
+    return left
+
 class AgentState(TypedDict):
     # Standard LangGraph message management
     messages: Annotated[list, add_messages]
+    message_cursor: int # How many messages are already in the persisted message log
+    conversation_summary: str # Rolling summary of the messages folded out of `messages`
+    summarized_count: int # How many messages (from the start of the log) the summary covers
     
     # Student Context
     student_id: str
@@ -20,7 +35,8 @@ class AgentState(TypedDict):
     current_module: Optional[str]
     
     # Progress & Mastery (Mastery Tracking Algorithm data)
-    mastery_levels: Dict[str, MasteryData] 
+    mastery_levels: Annotated[Dict[str, MasteryData], merge_mastery_levels] # merged per topic
+    mastery_aggregate: Dict[str, float] # Running {"sum", "weight", "count"} over mastery_levels
     global_mastery_score: float # Overall progress
     
     # Agent Coordination
@@ -7,6 +7,8 @@ load_dotenv()
 
 sys.path.append(os.getcwd())
 
+from langchain_core.messages import HumanMessage
+
 from agents.tutor import tutor_agent
 
 try:
@@ -18,7 +20,16 @@ try:
         
     print(f"Using Model: {tutor_agent.llm.model}")
     print("Sending request to Gemini...")
-    response = tutor_agent.generate_response("What is a Linked List?")
+    # generate_response takes the graph state, not a bare question
+    state = {
+        "messages": [HumanMessage(content="What is a Linked List?")],
+        "current_topic": "DSA",
+        "current_module": "Linked Lists",
+        "global_mastery_score": 0.0,
+        "frustration_level": 0.0,
+        "sentiment": "neutral",
+    }
+    response = tutor_agent.generate_response(state, use_cache=False)
     print("-" * 20)
     print(f"Tutor Response: {response}")
     print("-" * 20)
@@ -0,0 +1,39 @@
+import random
+
+from ml.mastery import (
+    aggregate_from_levels,
+    check_aggregate,
+    global_score_from_aggregate,
+    update_mastery_incremental,
+)
+from state import merge_mastery_levels
+
+
+def test_running_aggregate_matches_recompute():
+    # Random evaluations: new topics, re-evaluations and weight overrides
+    rng = random.Random(0)
+    levels = {}
+    aggregate = aggregate_from_levels(levels)
+    for _ in range(2000):
+        topic = f"topic-{rng.randrange(40)}"
+        weight = rng.choice((None, None, None, 0.5, 1.0, 2.0, 3.0))
+        levels[topic], aggregate, score = update_mastery_incremental(
+            levels.get(topic), rng.randint(0, 10), aggregate, weight=weight,
+        )
+        assert check_aggregate(levels, aggregate) == []
+        expected = global_score_from_aggregate(aggregate_from_levels(levels))
+        assert abs(score - expected) <= 1.5e-4  # summation order differs
+
+
+def test_check_aggregate_reports_drift():
+    levels = {"DSA": {"score": 0.5, "weight": 1.0}}
+    assert check_aggregate(levels, {"sum": 0.4, "weight": 1.0, "count": 1}) != []
+    assert check_aggregate(levels, {"sum": 0.5, "weight": 1.0, "count": 2}) != []
+
+
+def test_merge_mastery_levels_leaves_graph_input_untouched():
+    given = {"DSA": {"score": 0.5}}
+    merged = merge_mastery_levels({}, given)
+    merged = merge_mastery_levels(merged, {"OOP": {"score": 0.2}})
+    assert merged == {"DSA": {"score": 0.5}, "OOP": {"score": 0.2}}
+    assert given == {"DSA": {"score": 0.5}}